@@ -2,6 +2,10 @@
 OVN Store Advanced Chatbot
 Main orchestrator for all chatbot functionality
 """
+import copy
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any
 
 # Core modules
@@ -23,6 +27,9 @@ from api.django_client import DjangoAPIClient
 # Config
 from config import RESPONSES, QUICK_REPLIES
 
+# Deletes every non-digit Latin-1 character in one C-level str.translate pass
+_NON_DIGITS_DEL = str.maketrans('', '', ''.join(chr(c) for c in range(256) if not chr(c).isdigit()))
+
 
 class OVNStoreChatbot:
     """
@@ -30,6 +37,27 @@ class OVNStoreChatbot:
     Routes messages to appropriate handlers based on intent and state.
     """
 
+    POLICY_RESPONSE = """📋 **OVN Store Policies:**
+
+• 🚚 **Free Shipping:** On orders above Rs. 1,000
+• ↩️ **Return Policy:** 7-day return for unused items
+• 💰 **Payment:** Cash on Delivery available
+• 📅 **Delivery:** 3-5 business days in Nepal
+
+How else can I help you?"""
+    POLICY_QUICK_REPLIES = ('Browse Products', 'Track Order')
+
+    # Exact-match response cache for repeated prompts in IDLE state
+    RESPONSE_CACHE_SIZE = 128
+    RESPONSE_CACHE_TTL_SECONDS = 300
+    # Stateful or per-user intents - never served from cache
+    UNCACHEABLE_INTENTS = frozenset({
+        'product_detail', 'order_tracking', 'order_placement',
+        'support', 'review_view', 'review_submit'
+    })
+    # Listing intents - an empty listing may be a catalog outage, so it isn't cached
+    LISTING_INTENTS = frozenset({'product_search', 'flash_sale', 'categories'})
+
     def __init__(self):
         # Initialize core components
         self.session_manager = SessionManager()
@@ -39,14 +67,27 @@ class OVNStoreChatbot:
         self.ai_engine = AIEngine()
         self.api_client = DjangoAPIClient()
 
-        # Initialize handlers
-        self.handlers = {
-            'product': ProductHandler(self.api_client),
-            'order_tracking': OrderTrackingHandler(self.api_client),
-            'order_placement': OrderPlacementHandler(self.api_client),
-            'support': SupportHandler(self.api_client),
-            'review': ReviewHandler(self.api_client)
+        # Canned replies for general intents, resolved once
+        self._responses = {
+            intent: RESPONSES.get(intent, default)
+            for intent, default in [
+                ('greeting', "Hello! How can I help you?"),
+                ('thanks', "You're welcome!"),
+                ('bye', "Goodbye!")
+            ]
+        }
+        self._quick_greeting = tuple(QUICK_REPLIES.get('greeting', ()))
+
+        # Handlers are built on first dispatch - many sessions never reach all of them
+        self._handler_factories = {
+            'product': lambda: ProductHandler(self.api_client),
+            'order_tracking': lambda: OrderTrackingHandler(self.api_client),
+            'order_placement': lambda: OrderPlacementHandler(self.api_client),
+            'support': lambda: SupportHandler(self.api_client),
+            'review': lambda: ReviewHandler(self.api_client)
         }
+        self._handlers_cache = {}
+        self._handlers_lock = threading.Lock()
 
         # Intent to handler mapping
         self.intent_handler_map = {
@@ -61,15 +102,24 @@ class OVNStoreChatbot:
             'review_submit': 'review'
         }
 
+        # (state, intent) -> handler, memoized on first lookup
+        self._dispatch = {}
+
+        # (normalized_message, state) -> (expires_at, response, last_viewed_products)
+        self._response_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
         print("OVN Store Chatbot initialized!")
 
-    def chat(self, user_message: str, session_id: str = "default") -> Dict[str, Any]:
+    def chat(self, user_message: str, session_id: str = "default", stream: bool = False) -> Dict[str, Any]:
         """
         Main chat function - processes user message and returns response.
 
         Args:
             user_message: The user's message
             session_id: Unique session identifier
+            stream: Return AI-generated replies as a 'stream' of text pieces
+                (message is None until consumed); other replies are unchanged
 
         Returns:
             Dictionary with message, products, categories, quick_replies, etc.
@@ -80,18 +130,53 @@ class OVNStoreChatbot:
         # Add user message to history
         session.add_message("user", user_message)
 
+        # Lowercased once per turn - shared by the cache key and intent detection
+        message_lower = user_message.strip().lower()
+
+        # Serve repeated prompts from cache (IDLE state only - flows are stateful)
+        cache_key = None
+        if session.state == ConversationState.IDLE:
+            cache_key = (message_lower, session.state.value)
+            cached = self._cache_get(cache_key)
+            if cached:
+                response, last_viewed = cached
+                if last_viewed is not None:
+                    session.last_viewed_products = last_viewed
+                session.add_message("assistant", response['message'])
+                return response
+            last_viewed_before = session.last_viewed_products
+
+        response = self._route_message(user_message, session, stream, message_lower)
+
+        if (cache_key is not None and 'stream' not in response and session.state == ConversationState.IDLE
+                and self._is_cacheable(response)):
+            # Remember products the handler showed so follow-ups like "Buy Now" still work
+            last_viewed = None
+            if session.last_viewed_products is not last_viewed_before:
+                last_viewed = session.last_viewed_products
+            self._cache_put(cache_key, response, last_viewed)
+
+        return response
+
+    def _route_message(self, user_message: str, session: SessionData, stream: bool = False,
+                       message_lower: str = None) -> Dict[str, Any]:
+        """Detect intent and dispatch the message to a handler"""
+        if message_lower is None:
+            message_lower = user_message.strip().lower()
+
         # Check if user wants to cancel current flow
         if self.state_machine.should_cancel(user_message) and self.state_machine.is_in_flow(session):
             session.reset_state()
             return self._build_response(
                 "Cancelled. How else can I help you?",
-                quick_replies=QUICK_REPLIES.get('greeting', [])
+                quick_replies=self._quick_greeting
             )
 
         # Detect intent and extract entities
         intent_result = self.intent_detector.detect(
             user_message,
-            session.get_recent_history()
+            session.get_recent_history(),
+            message_lower=message_lower
         )
         entity_result = self.entity_extractor.extract(user_message, intent_result.intent)
 
@@ -106,7 +191,10 @@ class OVNStoreChatbot:
             phone = entities.get('phone')
             clean_msg = user_message.strip()
             # Check if message is primarily a phone number (10 digits, with possible formatting)
-            digits_only = ''.join(filter(str.isdigit, clean_msg))
+            if clean_msg.isascii():
+                digits_only = clean_msg.translate(_NON_DIGITS_DEL)
+            else:
+                digits_only = ''.join(filter(str.isdigit, clean_msg))
             if phone or (len(digits_only) == 10 and len(clean_msg) <= 15):
                 # User sent a phone number - assume order tracking
                 intent_result.intent = 'order_tracking'
@@ -117,7 +205,6 @@ class OVNStoreChatbot:
         # Smart product name detection - triggers for product-like patterns
         # Only when intent is 'general' with very low confidence (greeting/thanks/bye have higher confidence now)
         if session.state == ConversationState.IDLE and intent_result.intent == 'general' and intent_result.confidence < 0.3:
-            msg_lower = user_message.lower().strip()
             import re
 
             # Pattern-based detection for product queries
@@ -128,7 +215,7 @@ class OVNStoreChatbot:
                 # Product type words - only match if they're the main word (not greetings)
                 r'\b(jar|cup|bottle|brush|lamp|toothbrush|bag|phone|stand|clover|stanley|vacuum)\b',
             ]
-            is_product_query = any(re.search(pattern, msg_lower) for pattern in product_patterns)
+            is_product_query = any(re.search(pattern, message_lower) for pattern in product_patterns)
 
             if is_product_query:
                 intent_result.intent = 'product_search'
@@ -161,67 +248,86 @@ class OVNStoreChatbot:
             )
 
         # Handle general intents without specific handler
-        return self._handle_general_intent(user_message, intent_result.intent, session, entities)
+        return self._handle_general_intent(user_message, intent_result.intent, session, entities, stream)
 
     def _get_handler(self, intent: str, state: ConversationState):
-        """Get the appropriate handler for intent and state"""
+        """
+        Get the appropriate handler for intent and state.
+        Memoized per (state, intent); reset self._dispatch if the handler mappings change.
+        """
+        key = (state, intent)
+        try:
+            return self._dispatch[key]
+        except KeyError:
+            handler = self._resolve_handler(intent, state)
+            self._dispatch[key] = handler
+            return handler
+
+    def _get_handler_instance(self, handler_type: str):
+        """Get a handler by type, building it on first use"""
+        handler = self._handlers_cache.get(handler_type)
+        if handler is None:
+            with self._handlers_lock:
+                handler = self._handlers_cache.get(handler_type)
+                if handler is None:
+                    handler = self._handler_factories[handler_type]()
+                    self._handlers_cache[handler_type] = handler
+        return handler
+
+    def _resolve_handler(self, intent: str, state: ConversationState):
+        """Resolve the handler for intent and state from the handler mappings"""
         # First check if we're in an active flow
         if state != ConversationState.IDLE:
             handler_type = self.state_machine.get_handler_type(state)
-            if handler_type and handler_type in self.handlers:
-                return self.handlers[handler_type]
+            if handler_type and handler_type in self._handler_factories:
+                return self._get_handler_instance(handler_type)
 
         # Check intent mapping
         handler_type = self.intent_handler_map.get(intent)
-        if handler_type and handler_type in self.handlers:
-            handler = self.handlers[handler_type]
+        if handler_type and handler_type in self._handler_factories:
+            handler = self._get_handler_instance(handler_type)
             if handler.can_handle(intent, state):
                 return handler
 
         return None
 
-    def _handle_general_intent(self, message: str, intent: str, session: SessionData, entities: Dict) -> Dict:
+    def _handle_general_intent(self, message: str, intent: str, session: SessionData, entities: Dict,
+                               stream: bool = False) -> Dict:
         """Handle general intents that don't need specific handlers"""
 
         if intent == 'greeting':
-            response = RESPONSES.get('greeting', "Hello! How can I help you?")
+            response = self._responses['greeting']
             session.add_message("assistant", response)
             return self._build_response(
                 response,
-                quick_replies=QUICK_REPLIES.get('greeting', []),
+                quick_replies=self._quick_greeting,
                 intent='greeting'
             )
 
         elif intent == 'thanks':
-            response = RESPONSES.get('thanks', "You're welcome!")
+            response = self._responses['thanks']
             session.add_message("assistant", response)
             return self._build_response(response, intent='thanks')
 
         elif intent == 'bye':
-            response = RESPONSES.get('bye', "Goodbye!")
+            response = self._responses['bye']
             session.add_message("assistant", response)
             return self._build_response(response, intent='bye')
 
         elif intent == 'policy':
-            response = """📋 **OVN Store Policies:**
-
-• 🚚 **Free Shipping:** On orders above Rs. 1,000
-• ↩️ **Return Policy:** 7-day return for unused items
-• 💰 **Payment:** Cash on Delivery available
-• 📅 **Delivery:** 3-5 business days in Nepal
-
-How else can I help you?"""
+            response = self.POLICY_RESPONSE
             session.add_message("assistant", response)
             return self._build_response(
                 response,
-                quick_replies=['Browse Products', 'Track Order'],
+                quick_replies=self.POLICY_QUICK_REPLIES,
                 intent='policy'
             )
 
         # Smart fallback for any unexpected/unusual questions
-        return self._handle_unexpected_question(message, intent, session, entities)
+        return self._handle_unexpected_question(message, intent, session, entities, stream)
 
-    def _handle_unexpected_question(self, message: str, intent: str, session: SessionData, entities: Dict) -> Dict:
+    def _handle_unexpected_question(self, message: str, intent: str, session: SessionData, entities: Dict,
+                                    stream: bool = False) -> Dict:
         """
         Handler for unexpected/unusual questions.
         Uses fast AI response or pattern-based fallback.
@@ -235,7 +341,18 @@ How else can I help you?"""
 
         # Use AI for intelligent responses
         if self.ai_engine.is_available():
-            # Use fast mode - quick response
+            if stream:
+                pieces = self.ai_engine.generate_response_stream(
+                    message,
+                    context=session.state_context,
+                    intent=intent,
+                    fast_mode=True
+                )
+                response = self._build_response(None)
+                response['stream'] = self._stream_to_history(pieces, session)
+                return response
+
+            # Use fast mode - quick response (near-duplicates served from the engine's cache)
             ai_response = self.ai_engine.generate_response(
                 message,
                 context=session.state_context,
@@ -243,12 +360,23 @@ How else can I help you?"""
                 fast_mode=True
             )
             session.add_message("assistant", ai_response)
+            # A canned reply means the AI call failed - let the next asker retry it
+            if self.ai_engine.is_fallback_response(ai_response):
+                return self._build_response(ai_response, metadata={'cacheable': False})
             return self._build_response(ai_response)
 
         # Fallback if AI not available
         fallback = "🤔 I'm not sure how to help with that. I can help you browse products, track orders, or place new orders. What would you like to do?"
         session.add_message("assistant", fallback)
-        return self._build_response(fallback)
+        return self._build_response(fallback, metadata={'cacheable': False})
+
+    def _stream_to_history(self, pieces, session: SessionData):
+        """Pass streamed reply pieces through, then record the full reply in history"""
+        parts = []
+        for piece in pieces:
+            parts.append(piece)
+            yield piece
+        session.add_message("assistant", "".join(parts))
 
     def _get_friendly_fallback(self, message: str) -> str:
         """Get a friendly fallback response - returns None to let AI handle most queries"""
@@ -286,6 +414,52 @@ How else can I help you?"""
             'session_id': kwargs.get('session_id', 'default')
         }
 
+    def _is_cacheable(self, response: Dict[str, Any]) -> bool:
+        """
+        Check if a reply can be served to other sessions.
+        Only successful turns qualify - failure and fallback replies
+        (marked metadata['cacheable'] = False) must be retried.
+        """
+        intent = response.get('intent')
+        if intent in self.UNCACHEABLE_INTENTS:
+            return False
+        if response.get('metadata', {}).get('cacheable') is False:
+            return False
+        if intent in self.LISTING_INTENTS and not (response.get('products') or response.get('categories')):
+            return False
+        return True
+
+    def _cache_get(self, key: tuple) -> Optional[tuple]:
+        """Get a cached (response, last_viewed_products) pair, deep-copied"""
+        with self._cache_lock:
+            entry = self._response_cache.get(key)
+            if entry is None:
+                return None
+            expires_at, response, last_viewed = entry
+            if expires_at < time.monotonic():
+                del self._response_cache[key]
+                return None
+            self._response_cache.move_to_end(key)
+        return copy.deepcopy(response), copy.deepcopy(last_viewed)
+
+    def _cache_put(self, key: tuple, response: Dict[str, Any], last_viewed: Optional[List[Dict]]):
+        """Cache a response, evicting the least recently used entry when full"""
+        entry = (
+            time.monotonic() + self.RESPONSE_CACHE_TTL_SECONDS,
+            copy.deepcopy(response),
+            copy.deepcopy(last_viewed)
+        )
+        with self._cache_lock:
+            self._response_cache[key] = entry
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > self.RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+
+    def clear_response_cache(self):
+        """Drop all cached responses"""
+        with self._cache_lock:
+            self._response_cache.clear()
+
     def get_session_info(self, session_id: str) -> Dict:
         """Get session information for debugging"""
         session = self.session_manager.get(session_id)
@@ -295,6 +469,7 @@ How else can I help you?"""
 
     def clear_session(self, session_id: str) -> str:
         """Clear a session"""
+        # The response cache is shared by every session, so it is left alone here
         self.session_manager.delete(session_id)
         return "Session cleared!"
 
@@ -303,6 +478,22 @@ How else can I help you?"""
         return self.session_manager.get_active_sessions_count()
 
 
+# Process-wide chatbot - sessions live in its SessionManager and the detectors
+# hold only read-only compiled data, so one instance serves every thread
+_bot = None
+_bot_lock = threading.Lock()
+
+
+def get_bot() -> OVNStoreChatbot:
+    """Get the shared chatbot instance, creating it on first use"""
+    global _bot
+    if _bot is None:
+        with _bot_lock:
+            if _bot is None:
+                _bot = OVNStoreChatbot()
+    return _bot
+
+
 # For backward compatibility and testing
 if __name__ == "__main__":
     bot = OVNStoreChatbot()
@@ -10,11 +10,30 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "ovn_store")
 
+# Connection pool for the read-heavy chat workload (small pool, fail fast,
+# zlib wire compression for large product descriptions)
+MONGO_CLIENT_OPTIONS = {
+    "maxPoolSize": 10,
+    "minPoolSize": 2,
+    "serverSelectionTimeoutMS": 2000,
+    "connectTimeoutMS": 2000,
+    "socketTimeoutMS": 3000,
+    "compressors": "zlib",
+    "w": 1,
+}
+
 # Groq API Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = "llama-3.3-70b-versatile"  # For complex queries
 GROQ_MODEL_FAST = "llama-3.1-8b-instant"  # For quick responses
 
+# AI response cache - set AI_CACHE_PATH to keep cached answers across restarts
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "")
+
+# Follow-up questions to predict and pre-answer after each new AI answer (0 = off).
+# Each prefetch costs 1 + N extra fast-model calls.
+AI_PREFETCH_FOLLOWUPS = int(os.getenv("AI_PREFETCH_FOLLOWUPS", "0"))
+
 # Django Backend API
 DJANGO_BASE_URL = os.getenv("DJANGO_BASE_URL", "http://localhost:8000")
 
@@ -4,7 +4,6 @@ Core modules for OVN Store Chatbot
 from .session import SessionManager, SessionData
 from .state_machine import ConversationState, StateMachine
 from .intent import IntentDetector, EntityExtractor
-from .ai_engine import AIEngine
 
 __all__ = [
     'SessionManager', 'SessionData',
@@ -12,3 +11,11 @@ __all__ = [
     'IntentDetector', 'EntityExtractor',
     'AIEngine'
 ]
+
+
+def __getattr__(name):
+    """Import AIEngine (and the Groq SDK behind it) only on first access"""
+    if name == 'AIEngine':
+        from .ai_engine import AIEngine
+        return AIEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,14 +3,24 @@ AI Engine for OVN Store Chatbot
 Uses Groq API with Llama 3.3 for natural language understanding
 Enhanced with Chain-of-Thought reasoning for smarter responses
 """
+import asyncio
+import atexit
+import hashlib
 import json
+import logging
 import re
-from typing import Dict, List, Optional, Any
-from groq import Groq
+import threading
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import GROQ_API_KEY, GROQ_MODEL, STORE_INFO
+from config import GROQ_API_KEY, GROQ_MODEL, STORE_INFO, AI_CACHE_PATH, AI_PREFETCH_FOLLOWUPS
+from .semantic_cache import SemanticCache
 
 # Try to import fast model, fallback to main model
 try:
@@ -18,6 +28,164 @@ try:
 except ImportError:
     GROQ_MODEL_FAST = GROQ_MODEL
 
+try:
+    import h2  # noqa: F401 - enables HTTP/2 on the shared client
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+try:
+    from orjson import loads as _json_loads  # Errors subclass ValueError, like json's
+except ImportError:
+    _json_loads = json.loads  # Optional - falls back to the stdlib parser
+
+logger = logging.getLogger(__name__)
+
+# Plain yes/no replies (including stretched typos like "yesss", "nooo") need no model call
+_YES_PATTERN = re.compile(r'^(y+e*s+|ya+|yep+|yup+|sure|ok+|okay|confirm|correct|right|👍)$', re.IGNORECASE)
+_NO_PATTERN = re.compile(r'^(n+o+|nope+|nah|never|cancel|stop|👎)$', re.IGNORECASE)
+
+_http_client = None
+# Event loop -> (pooled async client, generator that closes it at loop shutdown)
+_async_http_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _request_key(*parts: str) -> str:
+    """Short content hash of a request, used as its Idempotency-Key"""
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _strip_tags_stream(pieces: Iterable[str]) -> Iterator[str]:
+    """
+    Streaming counterpart of AIEngine._clean_response's tag removal.
+    Drops <thinking>...</thinking> blocks and any other tags from text
+    arriving in arbitrary pieces, holding back only a partial tag.
+    """
+    pending = ''
+    in_thinking = False
+    for piece in pieces:
+        pending += piece
+        while pending:
+            if in_thinking:
+                end = pending.find('</thinking>')
+                if end < 0:
+                    # Keep just enough to recognise a closing tag split across pieces
+                    pending = pending[-(len('</thinking>') - 1):]
+                    break
+                pending = pending[end + len('</thinking>'):]
+                in_thinking = False
+                continue
+
+            start = pending.find('<')
+            if start < 0:
+                yield pending
+                pending = ''
+                break
+            if start:
+                yield pending[:start]
+                pending = pending[start:]
+            close = pending.find('>')
+            if close < 0:
+                break  # Tag not complete yet
+            in_thinking = pending[:close + 1] == '<thinking>'
+            pending = pending[close + 1:]
+
+    if pending and not in_thinking:
+        yield pending
+
+
+def _pool_options() -> Dict[str, Any]:
+    """Connection pool settings shared by the sync and async HTTP clients"""
+    import httpx
+    return {
+        "http2": _HTTP2_AVAILABLE,
+        "limits": httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        "timeout": 30.0,
+    }
+
+
+def _get_http_client() -> "httpx.Client":
+    """
+    Get the process-wide pooled HTTP client shared by every Groq client.
+    Keep-alive (and HTTP/2 multiplexing when h2 is installed) avoids a new
+    TLS handshake per completion call.
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.Client(**_pool_options())
+        atexit.register(_http_client.close)
+    return _http_client
+
+
+async def _close_at_loop_shutdown(client: "httpx.AsyncClient"):
+    """Suspends until the loop finalizes async generators, then closes client"""
+    try:
+        yield
+    finally:
+        await client.aclose()
+        # The generator holds the loop's finalizer hook - drop it so the loop can be freed
+        _async_http_clients.pop(asyncio.get_running_loop(), None)
+
+
+def _get_async_http_client() -> "httpx.AsyncClient":
+    """
+    Get the pooled HTTP client shared by every AsyncGroq client on the running
+    event loop, so concurrent async calls reuse warm connections instead of
+    one pool per engine. Pooled connections are bound to the loop that opened
+    them, so each loop gets its own client. It is closed while that loop is
+    still running, when asyncio.run() finalizes async generators.
+    Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _async_http_clients.get(loop)
+    if entry is None:
+        import httpx
+        client = httpx.AsyncClient(**_pool_options())
+        closer = _close_at_loop_shutdown(client)
+        # Started as a task so the loop tracks the generator; kept referenced here
+        loop.create_task(closer.__anext__())
+        entry = _async_http_clients[loop] = (client, closer)
+    return entry[0]
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def _get_response_cache() -> SemanticCache:
+    """
+    Get the process-wide cache of fast-mode AI answers shared by every engine.
+    Loaded from AI_CACHE_PATH (when set) on first use and saved back at exit.
+    """
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = SemanticCache(
+                max_size=AIEngine.CACHE_MAX_ENTRIES,
+                threshold=AIEngine.CACHE_SIMILARITY,
+                ttl=AIEngine.CACHE_TTL_SECONDS,
+                path=AI_CACHE_PATH or None
+            )
+            if AI_CACHE_PATH:
+                atexit.register(_response_cache.save)
+    return _response_cache
+
+
+_prefetch_executor = None
+_prefetched = set()  # Normalized messages whose follow-ups were already prefetched
+_prefetch_lock = threading.Lock()
+
+
+def _get_prefetch_executor() -> ThreadPoolExecutor:
+    """Get the small background pool that pre-answers predicted follow-ups"""
+    global _prefetch_executor
+    with _prefetch_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-prefetch")
+            atexit.register(_prefetch_executor.shutdown, wait=False)
+    return _prefetch_executor
+
 
 class AIEngine:
     """
@@ -88,6 +256,13 @@ I can help you find products, place orders, or track deliveries. What would you
 5. Always be helpful and friendly
 """
 
+    # Static prefix for fast-mode replies - never interpolate per-request data here,
+    # so the prompt prefix stays identical across calls and can be cached upstream
+    FAST_SYSTEM_PROMPT = f"""You are OVN Store's shopping assistant. Be brief and helpful.
+Store: Free shipping above Rs.{STORE_INFO['free_shipping_threshold']}, {STORE_INFO['return_days']}-day returns, Cash on Delivery, {STORE_INFO['delivery_days']} day delivery in Nepal.
+
+Respond in 1-2 sentences. Be friendly. Use emojis."""
+
     THINKING_PROMPT = """Before responding, think through this step by step:
 
 <thinking>
@@ -98,18 +273,200 @@ I can help you find products, place orders, or track deliveries. What would you
 
 Now respond naturally (don't show the thinking tags to user):"""
 
+    # Instructions for solve_problem - the customer's issue arrives as the last user turn
+    PROBLEM_SOLVING_SYSTEM = """You are a problem-solving AI for OVN Store. Analyze the customer's issue (their latest message) step by step. Always respond with valid JSON.
+
+Think through this carefully:
+
+1. PROBLEM IDENTIFICATION:
+   - What exactly is the issue?
+   - Is this about: order, product, payment, delivery, return, or general inquiry?
+
+2. INFORMATION CHECK:
+   - What info do I already have (conversation and context)?
+   - What info do I need from the customer?
+
+3. SOLUTION:
+   - What's the best way to resolve this?
+   - What are the next steps?
+
+4. RESPONSE:
+   - How should I communicate this to the customer?
+
+Respond with JSON:
+{
+    "problem_type": "order/product/delivery/payment/return/general",
+    "understood_issue": "brief description of the issue",
+    "needs_more_info": true/false,
+    "info_needed": ["list of info needed if any"],
+    "solution": "the solution or next steps",
+    "response": "friendly response to customer",
+    "suggested_action": "track_order/place_order/contact_support/provide_info/none"
+}"""
+
+    # asolve_problem samples one answer per temperature and majority-votes problem_type
+    SOLVE_VOTE_TEMPERATURES = (0.3, 0.5, 0.7)
+
+    SOLVE_UNAVAILABLE = {
+        "solution": "I'd be happy to help! Could you please provide more details?",
+        "needs_info": True,
+        "suggested_action": "ask_details"
+    }
+    SOLVE_ERROR = {
+        "solution": "I understand you have a concern. Let me help you with that.",
+        "needs_info": True,
+        "suggested_action": "ask_details"
+    }
+
+    # Static leading message shared by every full-mode request across all sessions.
+    # System + thinking instructions form one byte-identical block so the
+    # provider's prefix cache covers it; per-request content always comes after.
+    FULL_PROMPT_PREFIX = (
+        {"role": "system", "content": SYSTEM_PROMPT + "\n\n" + THINKING_PROMPT},
+    )
+
+    # Static system messages, built once and shared by reference across requests
+    # (treated as read-only - never mutate these dicts)
+    FAST_SYSTEM_MESSAGE = {"role": "system", "content": FAST_SYSTEM_PROMPT}
+    PROBLEM_SOLVING_SYSTEM_MESSAGE = {"role": "system", "content": PROBLEM_SOLVING_SYSTEM}
+    ANALYZE_SYSTEM_MESSAGE = {"role": "system", "content": "You analyze customer messages. Respond with valid JSON only."}
+    ENHANCE_SYSTEM_MESSAGE = {"role": "system", "content": "You improve chatbot responses to be natural and friendly."}
+
+    # Bound on remembered prefetch keys before the set is reset
+    PREFETCH_MEMORY = 1000
+
+    # Prior turns included in a prompt (reduced from 6 to 4)
+    PROMPT_HISTORY_TURNS = 4
+
     # Simple intents that don't need AI
     SIMPLE_INTENTS = ['greeting', 'thanks', 'bye', 'policy']
 
+    # Reply length budget per intent - decode time grows with every generated token
+    _MAX_TOKENS_BY_INTENT = {
+        'order_tracking': 120,
+        'order_placement': 150,
+        'support': 150,
+        'product_search': 150,
+        'flash_sale': 120,
+        'categories': 100,
+        'review_view': 100,
+        'review_submit': 80,
+        'general': 150,
+    }
+    DEFAULT_MAX_TOKENS = 150
+    # Full mode also writes a <thinking> block before the answer
+    THINKING_TOKENS = 150
+
+    # Fast-mode answers depend only on the message, so near-duplicate
+    # questions with the same intent reuse an earlier answer
+    CACHE_MAX_ENTRIES = 1000
+    CACHE_SIMILARITY = 0.9
+    CACHE_TTL_SECONDS = 3600
+
+    # Entries per exact-match cache of the classification calls
+    EXACT_CACHE_SIZE = 2048
+
+    # Structured calls use JSON mode - the reply is exactly one valid JSON object
+    JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+    # Room for the full analysis object - a truncated reply isn't valid JSON
+    ANALYZE_MAX_TOKENS = 300
+    # {"intent": ..., "confidence": ...} alone
+    CLASSIFY_MAX_TOKENS = 35
+
+    # Canned replies by intent ('product_search' is built per call from the product count)
+    FALLBACK_RESPONSES = {
+        'greeting': "👋 Hello! Welcome to OVN Store. How can I help you today?",
+        'flash_sale': "🔥 Check out our amazing flash sale deals!",
+        'order_tracking': "📦 I can help you track your order. Please provide your order ID or phone number.",
+        'order_placement': "🛒 I'd be happy to help you place an order!",
+        'support': "🤝 I'm here to help with any issues. What's the problem?",
+        'review_view': "⭐ Let me show you the reviews for this product.",
+        'review_submit': "📝 I can help you submit a review. Which product would you like to review?",
+        'policy': "📋 Free shipping on orders above Rs. 1000. 7-day return policy. Cash on Delivery available.",
+        'thanks': "😊 You're welcome! Is there anything else I can help with?",
+        'bye': "👋 Thank you for visiting OVN Store! Have a great day!",
+        'general': "🤔 How can I help you today? You can browse products, track orders, or ask me anything!"
+    }
+
+    # Already-polished replies enhance_response returns untouched
+    _CANNED_RESPONSES = frozenset(FALLBACK_RESPONSES.values())
+
+    # Shorter replies aren't worth an enhancement round-trip
+    ENHANCE_MIN_LENGTH = 60
+
+    # Response cleanup patterns, compiled once for every full-mode reply
+    _RE_THINKING = re.compile(r'<thinking>[\s\S]*?</thinking>')
+    _RE_TAGS = re.compile(r'<[^>]+>')
+    _RE_BLANK = re.compile(r'\n{3,}')
+
     def __init__(self, api_key: str = None):
         self.api_key = api_key or GROQ_API_KEY
-        self.client = Groq(api_key=self.api_key) if self.api_key else None
+        # groq (and httpx/pydantic behind it) is imported on first use, so
+        # importing this module stays cheap when no API call is ever made
+        self._client = None
+        self._async_client = None
+        # Event loop -> AsyncGroq on that loop's pooled HTTP client
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
         self.model = GROQ_MODEL
         self.model_fast = GROQ_MODEL_FAST
+        self.cache = _get_response_cache()
+
+        # Low-temperature classifiers see the same short replies ("yes", "no", order IDs)
+        # over and over - identical inputs reuse the model's raw JSON answer
+        self._analyze_cached = lru_cache(maxsize=self.EXACT_CACHE_SIZE)(self._analyze_message_raw)
+        self._classify_cached = lru_cache(maxsize=self.EXACT_CACHE_SIZE)(self._classify_intent_raw)
+        self._interpret_cached = lru_cache(maxsize=self.EXACT_CACHE_SIZE)(self._interpret_user_response_raw)
+        # Idempotency-Key -> in-flight async request, so concurrent duplicates share one call
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self):
+        """Groq client, created on first use (None without an API key)"""
+        if self._client is None and self.api_key:
+            from groq import Groq
+            self._client = Groq(api_key=self.api_key, http_client=_get_http_client())
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @property
+    def async_client(self):
+        """
+        Async twin for callers on an event loop - independent calls can overlap.
+        One per running loop (None without an API key); must be used from a coroutine.
+        """
+        if self._async_client is not None or not self.api_key:
+            return self._async_client
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from groq import AsyncGroq
+            client = self._async_clients[loop] = AsyncGroq(
+                api_key=self.api_key, http_client=_get_async_http_client()
+            )
+        return client
+
+    @async_client.setter
+    def async_client(self, value):
+        self._async_client = value
 
     def is_available(self) -> bool:
         """Check if AI engine is available"""
-        return self.client is not None and bool(self.api_key)
+        return bool(self.api_key)
+
+    def is_fallback_response(self, response: str) -> bool:
+        """Check if response is a canned fallback rather than a model answer"""
+        return response in self._CANNED_RESPONSES
+
+    def cache_clear(self) -> None:
+        """Drop cached classification results and fast-mode answers"""
+        self._analyze_cached.cache_clear()
+        self._classify_cached.cache_clear()
+        self._interpret_cached.cache_clear()
+        self.cache.clear()
 
     def generate_response(
         self,
@@ -134,12 +491,21 @@ Now respond naturally (don't show the thinking tags to user):"""
         try:
             # Use fast mode for most queries
             if fast_mode:
-                return self._generate_fast_response(user_message, context, intent, products)
+                cached = self.cache.get(user_message, intent)
+                if cached is not None:
+                    return cached
+
+                response = self._generate_fast_response(user_message, context, intent, products)
+                # Don't cache the canned fallback returned on AI errors
+                if response != self._fallback_response(intent, products):
+                    self.cache.put(user_message, response, intent)
+                    self._schedule_prefetch(user_message, response, intent)
+                return response
             else:
                 return self._generate_full_response(user_message, context, conversation_history, intent, products)
 
         except Exception as e:
-            print(f"AI Engine error: {e}")
+            logger.warning("AI Engine error: %s", e)
             return self._fallback_response(intent, products)
 
     def _generate_fast_response(
@@ -151,25 +517,11 @@ Now respond naturally (don't show the thinking tags to user):"""
     ) -> str:
         """Quick response using fast model - no chain-of-thought"""
         try:
-            # Simple, direct prompt
-            simple_prompt = f"""You are OVN Store's shopping assistant. Be brief and helpful.
-Store: Free shipping above Rs.1000, 7-day returns, Cash on Delivery, 3-5 day delivery in Nepal.
-
-User: {user_message}
-
-Respond in 1-2 sentences. Be friendly. Use emojis."""
-
-            response = self.client.chat.completions.create(
-                model=self.model_fast,
-                messages=[{"role": "user", "content": simple_prompt}],
-                max_tokens=150,
-                temperature=0.7
-            )
-
+            response = self.client.chat.completions.create(**self._fast_request(user_message, intent))
             return response.choices[0].message.content.strip()
 
         except Exception as e:
-            print(f"Fast response error: {e}")
+            logger.warning("Fast response error: %s", e)
             return self._fallback_response(intent, products)
 
     def _generate_full_response(
@@ -181,7 +533,103 @@ Respond in 1-2 sentences. Be friendly. Use emojis."""
         products: List[Dict] = None
     ) -> str:
         """Full response with chain-of-thought for complex queries"""
-        messages = [{"role": "system", "content": self.SYSTEM_PROMPT}]
+        response = self.client.chat.completions.create(
+            **self._full_request(user_message, context, conversation_history, intent, products)
+        )
+
+        result = response.choices[0].message.content.strip()
+        return self._clean_response(result)
+
+    def _schedule_prefetch(self, user_message: str, answer: str, intent: str) -> None:
+        """Pre-answer likely follow-ups in the background (once per message)"""
+        if AI_PREFETCH_FOLLOWUPS <= 0:
+            return
+
+        key = ' '.join(user_message.lower().split())
+        with _prefetch_lock:
+            if key in _prefetched:
+                return
+            if len(_prefetched) >= self.PREFETCH_MEMORY:
+                _prefetched.clear()
+            _prefetched.add(key)
+
+        _get_prefetch_executor().submit(self._prefetch_followups, user_message, answer, intent)
+
+    def _prefetch_followups(self, user_message: str, answer: str, intent: str) -> None:
+        """
+        Predict the customer's next questions and cache fast-mode answers to them,
+        so a matching next turn is served from the semantic cache.
+
+        Args:
+            user_message: Question just answered
+            answer: Answer that was given
+            intent: Intent the answers are cached under
+        """
+        try:
+            response = self.client.chat.completions.create(**self._followup_request(user_message, answer))
+            questions = _json_loads(self._reply_json(response)).get("questions", [])
+
+            for question in questions[:AI_PREFETCH_FOLLOWUPS]:
+                if not isinstance(question, str) or not question.strip():
+                    continue
+                if self.cache.get(question, intent) is not None:
+                    continue
+                reply = self.client.chat.completions.create(**self._fast_request(question, intent))
+                self.cache.put(question, reply.choices[0].message.content.strip(), intent)
+
+        except Exception as e:
+            logger.warning("Prefetch error: %s", e)
+
+    def _followup_request(self, user_message: str, answer: str) -> Dict:
+        """Completion arguments for predicting follow-up questions"""
+        prompt = f"""A customer asked: "{user_message}"
+The assistant answered: "{answer}"
+
+List the {AI_PREFETCH_FOLLOWUPS} questions this customer is most likely to ask next, in their own words.
+
+Respond with JSON: {{"questions": ["...", "..."]}}"""
+
+        return {
+            "model": self.model_fast,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 120,
+            "temperature": 0.3,
+            "response_format": self.JSON_RESPONSE_FORMAT
+        }
+
+    def _max_tokens(self, intent: str = None) -> int:
+        """Answer length budget for an intent"""
+        return self._MAX_TOKENS_BY_INTENT.get(intent, self.DEFAULT_MAX_TOKENS)
+
+    def _fast_request(self, user_message: str, intent: str = None) -> Dict:
+        """Completion arguments for a fast-mode reply"""
+        # Static system prefix, user message as its own turn
+        messages = [
+            self.FAST_SYSTEM_MESSAGE,
+            {"role": "user", "content": user_message}
+        ]
+        return {
+            "model": self.model_fast,
+            "messages": messages,
+            "max_tokens": self._max_tokens(intent),
+            "temperature": 0.7
+        }
+
+    def _full_request(
+        self,
+        user_message: str,
+        context: Dict = None,
+        conversation_history: List[Dict] = None,
+        intent: str = None,
+        products: List[Dict] = None
+    ) -> Dict:
+        """Completion arguments for a full chain-of-thought reply"""
+        # Least to most volatile: shared static prefix, then this session's
+        # history, then per-turn context, so each layer's prefix stays cacheable
+        messages = list(self.FULL_PROMPT_PREFIX)
+
+        # Add conversation history (limited)
+        messages.extend(self._history_messages(conversation_history))
 
         # Add context information
         context_info = self._build_context_info(context, intent, products)
@@ -191,29 +639,50 @@ Respond in 1-2 sentences. Be friendly. Use emojis."""
                 "content": f"📋 CURRENT CONTEXT:\n{context_info}"
             })
 
-        # Add conversation history (limited)
+        # Add user message (thinking instructions are part of the shared prefix)
+        messages.append({"role": "user", "content": user_message})
+
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self._max_tokens(intent) + self.THINKING_TOKENS,
+            "temperature": 0.7,
+            "top_p": 0.9
+        }
+
+    @classmethod
+    def _history_messages(cls, conversation_history: Sequence[Dict]) -> List[Dict]:
+        """
+        Last few user/assistant turns of the history as chat messages.
+
+        Args:
+            conversation_history: List or deque of {role, content} turns, oldest
+                first - callers keeping a deque(maxlen=8) append in O(1)
+
+        Returns:
+            Up to PROMPT_HISTORY_TURNS messages
+        """
+        messages = []
         if conversation_history:
-            for msg in conversation_history[-4:]:  # Reduced from 6 to 4
+            # Iterate the tail in place - no slice copy, and deques can't be sliced
+            skip = len(conversation_history) - cls.PROMPT_HISTORY_TURNS
+            tail = islice(conversation_history, skip, None) if skip > 0 else conversation_history
+            for msg in tail:
                 role = msg.get('role', 'user')
                 content = msg.get('content', '')
                 if role in ['user', 'assistant'] and content:
                     messages.append({"role": role, "content": content})
-
-        # Add thinking prompt + user message
-        enhanced_message = f"{self.THINKING_PROMPT}\n\nUser: {user_message}"
-        messages.append({"role": "user", "content": enhanced_message})
-
-        # Call Groq API
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            max_tokens=300,  # Reduced from 500
-            temperature=0.7,
-            top_p=0.9
-        )
-
-        result = response.choices[0].message.content.strip()
-        return self._clean_response(result)
+        return messages
+
+    @staticmethod
+    def _context_lines(context: Dict) -> str:
+        """Context as plain 'key: value' lines (nested dicts as 'k=v' pairs)"""
+        lines = []
+        for key, value in context.items():
+            if isinstance(value, dict):
+                value = ", ".join(f"{k}={v}" for k, v in value.items())
+            lines.append(f"{key}: {value}")
+        return "\n".join(lines)
 
     def solve_problem(
         self,
@@ -226,142 +695,215 @@ Respond in 1-2 sentences. Be friendly. Use emojis."""
         Returns both the solution and the reasoning.
         """
         if not self.is_available():
-            return {
-                "solution": "I'd be happy to help! Could you please provide more details?",
-                "needs_info": True,
-                "suggested_action": "ask_details"
-            }
+            return dict(self.SOLVE_UNAVAILABLE)
 
         try:
-            problem_solving_prompt = f"""You are a problem-solving assistant. Analyze this customer issue step by step.
+            response = self.client.chat.completions.create(
+                **self._solve_request(problem, context, conversation_history)
+            )
 
-CUSTOMER ISSUE: "{problem}"
+            # JSON mode guarantees a parseable object (empty replies fall to the except)
+            return _json_loads(self._reply_json(response))
 
-CONTEXT: {json.dumps(context) if context else "No additional context"}
+        except Exception as e:
+            logger.warning("Problem solving error: %s", e)
+            return dict(self.SOLVE_ERROR)
 
-Think through this carefully:
+    async def asolve_problem(
+        self,
+        problem: str,
+        context: Dict = None,
+        conversation_history: List[Dict] = None
+    ) -> Dict:
+        """
+        Async solve_problem with self-consistency: samples one solution per
+        SOLVE_VOTE_TEMPERATURES concurrently, so it takes about as long as a
+        single call but is steadier on ambiguous complaints.
+        """
+        if not self.is_available():
+            return dict(self.SOLVE_UNAVAILABLE)
 
-1. PROBLEM IDENTIFICATION:
-   - What exactly is the issue?
-   - Is this about: order, product, payment, delivery, return, or general inquiry?
+        try:
+            request = self._solve_request(problem, context, conversation_history)
+            replies = await asyncio.gather(
+                *(self.async_client.chat.completions.create(**dict(request, temperature=t))
+                  for t in self.SOLVE_VOTE_TEMPERATURES),
+                return_exceptions=True
+            )
 
-2. INFORMATION CHECK:
-   - What info do I already have?
-   - What info do I need from the customer?
+            solutions = []
+            for reply in replies:
+                if isinstance(reply, Exception):
+                    logger.warning("Problem solving error: %s", reply)
+                    continue
+                try:
+                    solutions.append(_json_loads(self._reply_json(reply)))
+                except ValueError:
+                    continue
 
-3. SOLUTION:
-   - What's the best way to resolve this?
-   - What are the next steps?
+            if not solutions:
+                return dict(self.SOLVE_ERROR)
+            return self._vote_solutions(solutions)
 
-4. RESPONSE:
-   - How should I communicate this to the customer?
+        except Exception as e:
+            logger.warning("Problem solving error: %s", e)
+            return dict(self.SOLVE_ERROR)
 
-Respond with JSON:
-{{
-    "problem_type": "order/product/delivery/payment/return/general",
-    "understood_issue": "brief description of the issue",
-    "needs_more_info": true/false,
-    "info_needed": ["list of info needed if any"],
-    "solution": "the solution or next steps",
-    "response": "friendly response to customer",
-    "suggested_action": "track_order/place_order/contact_support/provide_info/none"
-}}"""
+    def _solve_request(
+        self,
+        problem: str,
+        context: Dict = None,
+        conversation_history: List[Dict] = None
+    ) -> Dict:
+        """Completion arguments for solve_problem"""
+        # Static instructions first, then prior turns, context and the issue itself
+        messages = [self.PROBLEM_SOLVING_SYSTEM_MESSAGE]
+        messages.extend(self._history_messages(conversation_history))
+        if context:
+            messages.append({
+                "role": "system",
+                "content": "CONTEXT:\n" + self._context_lines(context)
+            })
+        messages.append({"role": "user", "content": problem})
+
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 350,  # JSON mode - no prose around the object
+            "temperature": 0.5,
+            "response_format": self.JSON_RESPONSE_FORMAT
+        }
 
-            messages = [
-                {"role": "system", "content": "You are a problem-solving AI. Always respond with valid JSON."},
-                {"role": "user", "content": problem_solving_prompt}
-            ]
+    @staticmethod
+    def _vote_solutions(solutions: List[Dict]) -> Dict:
+        """
+        Combine sampled solutions: keep the first one with the most common
+        problem_type, with info_needed merged from every solution that agrees.
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=500,
-                temperature=0.5
-            )
+        Args:
+            solutions: Parsed solve_problem JSON objects
 
-            result_text = response.choices[0].message.content.strip()
+        Returns:
+            Winning solution
+        """
+        votes = Counter(solution.get("problem_type") for solution in solutions)
+        winner = votes.most_common(1)[0][0]
+        agreeing = [solution for solution in solutions if solution.get("problem_type") == winner]
+
+        result = dict(agreeing[0])
+        info_needed = []
+        for solution in agreeing:
+            for item in solution.get("info_needed") or []:
+                if item not in info_needed:
+                    info_needed.append(item)
+        result["info_needed"] = info_needed
+        return result
+
+    def analyze_message(self, message: str) -> Dict:
+        """
+        Classify and deeply analyze a message in one API call.
+        classify_intent and understand_query are views of this result.
+
+        Args:
+            message: User message
 
-            # Extract JSON from response
-            json_match = re.search(r'\{[\s\S]*\}', result_text)
-            if json_match:
-                return json.loads(json_match.group())
+        Returns:
+            {"intent", "confidence", "entities", "sentiment", "urgency", "action", "summary"},
+            or {} if the AI is unavailable or the call failed
+        """
+        if not self.is_available():
+            return {}
 
-            return {
-                "solution": result_text,
-                "needs_info": False,
-                "suggested_action": "none"
-            }
+        try:
+            return self._parse_analysis(self._analyze_cached(message.strip()))
 
         except Exception as e:
-            print(f"Problem solving error: {e}")
-            return {
-                "solution": "I understand you have a concern. Let me help you with that.",
-                "needs_info": True,
-                "suggested_action": "ask_details"
-            }
+            logger.warning("Message analysis error: %s", e)
+            return {}
 
     def classify_intent(self, message: str, history: List[Dict] = None) -> Dict:
         """
         Fast intent classification using quick model.
+        Callers that also need understand_query should use preprocess (one call for both).
         """
         if not self.is_available():
-            return {"intent": "general", "confidence": 0.5}
+            return self._intent_view({})
 
         try:
-            # Simple, fast prompt for intent classification
-            prompt = f"""Classify this message into ONE category:
-"{message}"
+            return self._intent_view(self._parse_analysis(self._classify_cached(message.lower().strip())))
 
-Categories: order_tracking, order_placement, support, review_view, review_submit, product_search, flash_sale, greeting, policy, thanks, bye, general
+        except Exception as e:
+            logger.warning("Intent classification error: %s", e)
+            return self._intent_view({})
 
-Reply with JSON only: {{"intent": "category", "confidence": 0.X}}"""
+    def understand_query(self, message: str, context: Dict = None) -> Dict:
+        """
+        Deep understanding of user query - extracts entities and intent.
+        """
+        return self._understanding_view(self.analyze_message(message))
 
-            response = self.client.chat.completions.create(
-                model=self.model_fast,  # Use fast model
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=50,  # Minimal tokens
-                temperature=0.2  # More deterministic
-            )
+    def _analyze_message_raw(self, message: str) -> str:
+        """
+        Ask the model to analyze a message (cached per stripped message).
 
-            result_text = response.choices[0].message.content.strip()
+        Args:
+            message: Stripped message - case is kept for entity values
 
-            # Extract JSON
-            json_match = re.search(r'\{[\s\S]*?\}', result_text)
-            if json_match:
-                result = json.loads(json_match.group())
-                return {
-                    "intent": result.get("intent", "general"),
-                    "confidence": result.get("confidence", 0.7)
-                }
+        Returns:
+            JSON object text from the reply, or "" if it was empty
+        """
+        response = self.client.chat.completions.create(**self._analyze_request(message))
+        return self._reply_json(response)
 
-            return {"intent": "general", "confidence": 0.5}
+    def _classify_intent_raw(self, message: str) -> str:
+        """
+        Ask the fast model for an intent (cached per normalized message).
 
-        except Exception as e:
-            print(f"Intent classification error: {e}")
-            return {"intent": "general", "confidence": 0.5}
+        Args:
+            message: Lowercased, stripped message
 
-    def understand_query(self, message: str, context: Dict = None) -> Dict:
-        """
-        Deep understanding of user query - extracts entities and intent.
+        Returns:
+            JSON object text from the reply, or "" if it was empty
         """
-        if not self.is_available():
-            return {"understood": False}
+        response = self.client.chat.completions.create(**self._classify_request(message))
+        return self._reply_json(response)
 
-        try:
-            prompt = f"""Analyze this customer message deeply.
+    def _classify_request(self, message: str) -> Dict:
+        """Completion arguments for intent classification"""
+        prompt = f"""Classify this message into ONE category:
+"{message}"
+
+Categories: order_tracking, order_placement, support, review_view, review_submit, product_search, flash_sale, greeting, policy, thanks, bye, general
+
+Reply with JSON only: {{"intent": "category", "confidence": 0.X}}"""
+
+        return {
+            "model": self.model_fast,  # Use fast model
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.CLASSIFY_MAX_TOKENS,
+            "temperature": 0.2,  # More deterministic
+            "response_format": self.JSON_RESPONSE_FORMAT,
+            "extra_headers": {"Idempotency-Key": _request_key("classify", message)}
+        }
+
+    def _analyze_request(self, message: str) -> Dict:
+        """Completion arguments for message analysis"""
+        prompt = f"""Analyze this customer message deeply.
 
 MESSAGE: "{message}"
 
 Extract:
-1. Main intent (what they want to do)
-2. Entities (product names, order IDs, phone numbers, etc.)
-3. Sentiment (positive, negative, neutral)
-4. Urgency (high, medium, low)
-5. What action should the bot take?
+1. Intent - ONE of: order_tracking, order_placement, support, review_view, review_submit, product_search, flash_sale, greeting, policy, thanks, bye, general
+2. Confidence in that intent (0.0 to 1.0)
+3. Entities (product names, order IDs, phone numbers, etc.)
+4. Sentiment (positive, negative, neutral)
+5. Urgency (high, medium, low)
+6. What action should the bot take?
 
 Respond with JSON:
 {{
-    "intent": "main intent",
+    "intent": "category",
+    "confidence": 0.X,
     "entities": {{
         "product": "product name if mentioned",
         "order_id": "order ID if mentioned",
@@ -370,32 +912,217 @@ Respond with JSON:
     }},
     "sentiment": "positive/negative/neutral",
     "urgency": "high/medium/low",
-    "action": "suggested bot action",
-    "summary": "brief summary of what user wants"
+    "action": "suggested bot action (at most 8 words)",
+    "summary": "what user wants (at most 10 words)"
 }}"""
 
-            messages = [
-                {"role": "system", "content": "You analyze customer messages. Respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ]
+        messages = [
+            self.ANALYZE_SYSTEM_MESSAGE,
+            {"role": "user", "content": prompt}
+        ]
+
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": self.ANALYZE_MAX_TOKENS,
+            "temperature": 0.2,  # More deterministic
+            "response_format": self.JSON_RESPONSE_FORMAT,
+            # Same message, same request - provider-side retries needn't run it twice
+            "extra_headers": {"Idempotency-Key": _request_key("analyze", message)}
+        }
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=200,
-                temperature=0.3
-            )
+    @staticmethod
+    def _reply_json(response) -> str:
+        """
+        JSON object text of a JSON-mode completion reply.
+
+        Args:
+            response: Chat completion response
+
+        Returns:
+            JSON object text, or "" if the reply was empty
+        """
+        return (response.choices[0].message.content or "").strip()
+
+    @staticmethod
+    def _parse_analysis(result_json: str) -> Dict:
+        """Analysis dict from the model's JSON text ({} if empty)"""
+        return _json_loads(result_json) if result_json else {}
 
-            result_text = response.choices[0].message.content.strip()
-            json_match = re.search(r'\{[\s\S]*\}', result_text)
-            if json_match:
-                return json.loads(json_match.group())
+    @staticmethod
+    def _intent_view(analysis: Dict) -> Dict:
+        """classify_intent's result from an analysis"""
+        if not analysis:
+            return {"intent": "general", "confidence": 0.5}
+        return {
+            "intent": analysis.get("intent", "general"),
+            "confidence": analysis.get("confidence", 0.7)
+        }
 
+    @staticmethod
+    def _understanding_view(analysis: Dict) -> Dict:
+        """understand_query's result from an analysis"""
+        if not analysis:
             return {"understood": False}
+        return {key: value for key, value in analysis.items() if key != "confidence"}
 
+    def generate_response_stream(
+        self,
+        user_message: str,
+        context: Dict = None,
+        conversation_history: List[Dict] = None,
+        intent: str = None,
+        products: List[Dict] = None,
+        fast_mode: bool = True
+    ) -> Iterator[str]:
+        """
+        Streaming generate_response - yields the reply in pieces as tokens arrive.
+        Cached answers and fallbacks are yielded as a single piece.
+        """
+        if not self.is_available() or intent in self.SIMPLE_INTENTS:
+            yield self._fallback_response(intent, products)
+            return
+
+        if fast_mode:
+            cached = self.cache.get(user_message, intent)
+            if cached is not None:
+                yield cached
+                return
+            request = self._fast_request(user_message, intent)
+        else:
+            request = self._full_request(user_message, context, conversation_history, intent, products)
+
+        parts = []
+        try:
+            stream = self.client.chat.completions.create(stream=True, **request)
+            pieces = (chunk.choices[0].delta.content or "" for chunk in stream)
+            if not fast_mode:
+                pieces = _strip_tags_stream(pieces)
+            for piece in pieces:
+                if not parts:
+                    piece = piece.lstrip()
+                if piece:
+                    parts.append(piece)
+                    yield piece
         except Exception as e:
-            print(f"Query understanding error: {e}")
-            return {"understood": False}
+            logger.warning("AI Engine error: %s", e)
+            if not parts:
+                yield self._fallback_response(intent, products)
+            return
+
+        if fast_mode and parts:
+            self.cache.put(user_message, "".join(parts).rstrip(), intent)
+
+    async def agenerate_response(
+        self,
+        user_message: str,
+        context: Dict = None,
+        conversation_history: List[Dict] = None,
+        intent: str = None,
+        products: List[Dict] = None,
+        fast_mode: bool = True
+    ) -> str:
+        """
+        Async generate_response - same caching and fallbacks, but awaits
+        the API instead of blocking the calling thread.
+        """
+        if not self.is_available() or intent in self.SIMPLE_INTENTS:
+            return self._fallback_response(intent, products)
+
+        try:
+            if fast_mode:
+                cached = self.cache.get(user_message, intent)
+                if cached is not None:
+                    return cached
+
+                response = await self.async_client.chat.completions.create(**self._fast_request(user_message, intent))
+                result = response.choices[0].message.content.strip()
+                self.cache.put(user_message, result, intent)
+                return result
+
+            response = await self.async_client.chat.completions.create(
+                **self._full_request(user_message, context, conversation_history, intent, products)
+            )
+            return self._clean_response(response.choices[0].message.content.strip())
+
+        except Exception as e:
+            logger.warning("AI Engine error: %s", e)
+            return self._fallback_response(intent, products)
+
+    async def aanalyze_message(self, message: str) -> Dict:
+        """Async analyze_message"""
+        if not self.is_available():
+            return {}
+
+        try:
+            return self._parse_analysis(await self._arequest_shared(self._analyze_request(message.strip())))
+
+        except Exception as e:
+            logger.warning("Message analysis error: %s", e)
+            return {}
+
+    async def _arequest_shared(self, request: Dict) -> str:
+        """
+        Send a JSON-mode request, sharing one in-flight call among concurrent
+        identical requests (same Idempotency-Key) on the running loop.
+
+        Args:
+            request: Completion arguments with an Idempotency-Key header
+
+        Returns:
+            JSON object text from the reply, or "" if it was empty
+        """
+        key = request["extra_headers"]["Idempotency-Key"]
+
+        pending = self._inflight.get(key)
+        if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+            pending = asyncio.ensure_future(self._arequest_raw(request))
+            self._inflight[key] = pending
+            pending.add_done_callback(
+                lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None
+            )
+
+        # Shielded so one cancelled caller doesn't cancel the call for the others
+        return await asyncio.shield(pending)
+
+    async def _arequest_raw(self, request: Dict) -> str:
+        """Send prepared completion arguments on the async client"""
+        response = await self.async_client.chat.completions.create(**request)
+        return self._reply_json(response)
+
+    async def aclassify_intent(self, message: str, history: List[Dict] = None) -> Dict:
+        """Async classify_intent"""
+        if not self.is_available():
+            return self._intent_view({})
+
+        try:
+            request = self._classify_request(message.lower().strip())
+            return self._intent_view(self._parse_analysis(await self._arequest_shared(request)))
+
+        except Exception as e:
+            logger.warning("Intent classification error: %s", e)
+            return self._intent_view({})
+
+    async def aunderstand_query(self, message: str, context: Dict = None) -> Dict:
+        """Async understand_query"""
+        return self._understanding_view(await self.aanalyze_message(message))
+
+    async def preprocess(self, message: str) -> Tuple[Dict, Dict]:
+        """
+        Classify and analyze a message with a single API call
+        (plus a fast-model intent call only if the analysis fails).
+
+        Args:
+            message: User message
+
+        Returns:
+            (classify_intent result, understand_query result)
+        """
+        analysis = await self.aanalyze_message(message)
+        if not analysis:
+            # Analysis failed - still classify the intent with the short fast-model call
+            return await self.aclassify_intent(message), self._understanding_view(analysis)
+        return self._intent_view(analysis), self._understanding_view(analysis)
 
     def enhance_response(self, base_response: str, context: Dict = None) -> str:
         """
@@ -404,6 +1131,12 @@ Respond with JSON:
         if not self.is_available() or not base_response:
             return base_response
 
+        # Short, single-line statements and canned replies are already good
+        if (len(base_response) < self.ENHANCE_MIN_LENGTH
+                or ('\n' not in base_response and '?' not in base_response)
+                or base_response in self._CANNED_RESPONSES):
+            return base_response
+
         try:
             prompt = f"""Improve this chatbot response to be more natural and helpful.
 
@@ -419,7 +1152,7 @@ Rules:
 Improved response:"""
 
             messages = [
-                {"role": "system", "content": "You improve chatbot responses to be natural and friendly."},
+                self.ENHANCE_SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ]
 
@@ -473,11 +1206,11 @@ Improved response:"""
     def _clean_response(self, response: str) -> str:
         """Remove thinking tags and clean up response"""
         # Remove <thinking>...</thinking> blocks
-        response = re.sub(r'<thinking>[\s\S]*?</thinking>', '', response)
+        response = self._RE_THINKING.sub('', response)
         # Remove any leftover tags
-        response = re.sub(r'<[^>]+>', '', response)
+        response = self._RE_TAGS.sub('', response)
         # Clean up extra whitespace
-        response = re.sub(r'\n{3,}', '\n\n', response)
+        response = self._RE_BLANK.sub('\n\n', response)
         return response.strip()
 
     def interpret_user_response(self, message: str, expected_type: str = "confirmation") -> Dict:
@@ -495,7 +1228,28 @@ Improved response:"""
             return {"interpreted": message, "type": "unknown", "confidence": 0.5}
 
         try:
-            prompt = f"""Interpret this user message in context. The bot is expecting a "{expected_type}" response.
+            result_json = self._interpret_cached(message.strip(), expected_type)
+            if result_json:
+                return _json_loads(result_json)
+
+            return {"interpreted": message, "type": "unknown", "confidence": 0.5}
+
+        except Exception as e:
+            logger.warning("Interpretation error: %s", e)
+            return {"interpreted": message, "type": "unknown", "confidence": 0.5}
+
+    def _interpret_user_response_raw(self, message: str, expected_type: str) -> str:
+        """
+        Ask the fast model to interpret a reply (cached per message and expected type).
+
+        Args:
+            message: Stripped message - case is kept for names
+            expected_type: What the bot is expecting
+
+        Returns:
+            JSON object text from the reply, or "" if it contained none
+        """
+        prompt = f"""Interpret this user message in context. The bot is expecting a "{expected_type}" response.
 
 User said: "{message}"
 
@@ -512,48 +1266,39 @@ Common typos to consider:
 Respond with JSON only:
 {{"interpreted": "corrected message", "type": "confirmation/rejection/phone/order_id/name/other", "value": "extracted value if any", "confidence": 0.9}}"""
 
-            response = self.client.chat.completions.create(
-                model=self.model_fast,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=100,
-                temperature=0.2
-            )
-
-            result_text = response.choices[0].message.content.strip()
-            json_match = re.search(r'\{[\s\S]*?\}', result_text)
-            if json_match:
-                return json.loads(json_match.group())
-
-            return {"interpreted": message, "type": "unknown", "confidence": 0.5}
+        response = self.client.chat.completions.create(
+            model=self.model_fast,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=70,
+            temperature=0.2,
+            response_format=self.JSON_RESPONSE_FORMAT,
+            extra_headers={"Idempotency-Key": _request_key("interpret", message, expected_type)}
+        )
 
-        except Exception as e:
-            print(f"Interpretation error: {e}")
-            return {"interpreted": message, "type": "unknown", "confidence": 0.5}
+        return self._reply_json(response)
 
     def is_confirmation_ai(self, message: str) -> bool:
-        """Use AI to determine if message is a confirmation (yes)"""
+        """Determine if message is a confirmation (yes) - patterns first, AI for the rest"""
+        msg = message.strip().rstrip('!.')
+        if _YES_PATTERN.match(msg):
+            return True
+        if _NO_PATTERN.match(msg):
+            return False
         result = self.interpret_user_response(message, "confirmation")
         return result.get("type") == "confirmation" and result.get("confidence", 0) > 0.6
 
     def is_rejection_ai(self, message: str) -> bool:
-        """Use AI to determine if message is a rejection (no)"""
+        """Determine if message is a rejection (no) - patterns first, AI for the rest"""
+        msg = message.strip().rstrip('!.')
+        if _NO_PATTERN.match(msg):
+            return True
+        if _YES_PATTERN.match(msg):
+            return False
         result = self.interpret_user_response(message, "rejection")
         return result.get("type") == "rejection" and result.get("confidence", 0) > 0.6
 
     def _fallback_response(self, intent: str, products: List[Dict] = None) -> str:
         """Generate fallback response when AI is unavailable"""
-        fallbacks = {
-            'greeting': "👋 Hello! Welcome to OVN Store. How can I help you today?",
-            'product_search': f"🔍 Here are {len(products) if products else 'some'} products I found!",
-            'flash_sale': "🔥 Check out our amazing flash sale deals!",
-            'order_tracking': "📦 I can help you track your order. Please provide your order ID or phone number.",
-            'order_placement': "🛒 I'd be happy to help you place an order!",
-            'support': "🤝 I'm here to help with any issues. What's the problem?",
-            'review_view': "⭐ Let me show you the reviews for this product.",
-            'review_submit': "📝 I can help you submit a review. Which product would you like to review?",
-            'policy': "📋 Free shipping on orders above Rs. 1000. 7-day return policy. Cash on Delivery available.",
-            'thanks': "😊 You're welcome! Is there anything else I can help with?",
-            'bye': "👋 Thank you for visiting OVN Store! Have a great day!",
-            'general': "🤔 How can I help you today? You can browse products, track orders, or ask me anything!"
-        }
-        return fallbacks.get(intent, fallbacks['general'])
+        if intent == 'product_search':
+            return f"🔍 Here are {len(products) if products else 'some'} products I found!"
+        return self.FALLBACK_RESPONSES.get(intent, self.FALLBACK_RESPONSES['general'])
@@ -2,164 +2,175 @@
 Friendly Error Messages for OVN Store Chatbot
 User-friendly error messages for various error scenarios
 """
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+import json
 import random
 
+try:
+    from orjson import dumps as _json_dumps
+except ImportError:
+    def _json_dumps(obj) -> bytes:  # Optional - falls back to the stdlib encoder
+        return json.dumps(obj).encode('utf-8')
+
 
 # Error message templates with variations for natural feel
-FRIENDLY_ERRORS: Dict[str, list] = {
+FRIENDLY_ERRORS: Dict[str, Tuple[str, ...]] = {
     # Connection errors
-    'connection_error': [
+    'connection_error': (
         "I'm having trouble connecting right now. Please try again in a moment.",
         "Oops! Connection hiccup. Give me a second and try again.",
         "Having some network issues. Please try again shortly."
-    ],
+    ),
 
     # Timeout errors
-    'timeout': [
+    'timeout': (
         "That took longer than expected. Let me try again...",
         "Sorry, that request timed out. Please try once more.",
         "The response is taking too long. Let's try again."
-    ],
+    ),
 
     # Rate limiting
-    'rate_limited': [
+    'rate_limited': (
         "Whoa, slow down! Please wait a few seconds before sending more messages.",
         "You're sending messages too fast! Take a breather and try again.",
         "Please wait a moment before sending another message."
-    ],
+    ),
 
     # Product not found
-    'product_not_found': [
+    'product_not_found': (
         "I couldn't find that product. Try searching with different keywords!",
         "Hmm, no products match that search. Want to try different words?",
         "No results found. Try a different search term."
-    ],
+    ),
 
     # Order errors
-    'order_not_found': [
+    'order_not_found': (
         "I couldn't find that order. Please check the order ID and try again.",
         "No order found with that ID. Double-check and try again?",
         "That order doesn't exist in our system. Please verify the order number."
-    ],
+    ),
 
-    'order_failed': [
+    'order_failed': (
         "There was an issue placing your order. Please try again or contact support.",
         "Something went wrong with your order. Let's try again.",
         "Order couldn't be placed. Please try once more."
-    ],
+    ),
 
     # Validation errors
-    'invalid_phone': [
+    'invalid_phone': (
         "Please enter a valid 10-digit phone number (e.g., 9841234567)",
         "That doesn't look like a valid phone number. Try: 98XXXXXXXX",
         "Invalid phone format. Please use a 10-digit Nepal number."
-    ],
+    ),
 
-    'invalid_email': [
+    'invalid_email': (
         "Please enter a valid email address (e.g., name@example.com)",
         "That email doesn't look right. Can you check it?",
         "Invalid email format. Please try again."
-    ],
+    ),
 
-    'invalid_order_id': [
+    'invalid_order_id': (
         "Please enter a valid order ID",
         "That doesn't look like a valid order number. Check and try again.",
         "Invalid order ID format."
-    ],
+    ),
 
     # AI/API errors
-    'ai_unavailable': [
+    'ai_unavailable': (
         "My AI assistant is taking a short break. Using backup mode!",
         "AI is busy right now, but I can still help you!",
         "Switching to quick-response mode. How can I help?"
-    ],
+    ),
 
-    'api_error': [
+    'api_error': (
         "Something went wrong on our end. Please try again.",
         "We hit a small bump. Let's try that again.",
         "Technical hiccup! Please retry your request."
-    ],
+    ),
 
     # Server errors
-    'server_error': [
+    'server_error': (
         "Something went wrong on our end. Our team has been notified.",
         "We're experiencing some issues. Please try again in a moment.",
         "Unexpected error occurred. We're looking into it!"
-    ],
+    ),
 
     # Input errors
-    'empty_message': [
+    'empty_message': (
         "Please type a message to continue.",
         "I didn't catch that. What would you like to do?",
         "Your message was empty. How can I help you?"
-    ],
+    ),
 
-    'message_too_long': [
+    'message_too_long': (
         "That message is too long. Please keep it under 1000 characters.",
         "Whoa, that's a lot! Can you make it shorter?",
         "Message too long. Please shorten it and try again."
-    ],
+    ),
 
     # Session errors
-    'session_expired': [
+    'session_expired': (
         "Your session has expired. Let's start fresh!",
         "We lost track of our conversation. Starting over!",
         "Session timeout. How can I help you today?"
-    ],
+    ),
 
     # Support errors
-    'support_failed': [
+    'support_failed': (
         "Couldn't submit your support request. Please try again.",
         "Support ticket submission failed. Let's try once more.",
         "Error submitting request. Please retry."
-    ],
+    ),
 
     # Review errors
-    'review_failed': [
+    'review_failed': (
         "Couldn't submit your review. Please try again.",
         "Review submission failed. Let's try once more.",
         "Error posting review. Please retry."
-    ],
+    ),
 
-    'cannot_review': [
+    'cannot_review': (
         "You need to purchase this product before reviewing it.",
         "Reviews are only for verified purchases.",
         "Please buy this product first to leave a review."
-    ],
+    ),
 
     # General fallback
-    'unknown_error': [
+    'unknown_error': (
         "Something unexpected happened. Please try again.",
         "Oops! An error occurred. Let's try that again.",
         "Hit a snag there. Please retry your request."
-    ]
+    )
 }
 
 # Nepali-friendly error messages (Roman Nepali)
-NEPALI_ERRORS: Dict[str, list] = {
-    'connection_error': [
+NEPALI_ERRORS: Dict[str, Tuple[str, ...]] = {
+    'connection_error': (
         "Connection ma problem chha. Feri try garnus.",
         "Network issue chha. Ali bera ma try garnus."
-    ],
-    'rate_limited': [
+    ),
+    'rate_limited': (
         "Dherai chito message pathaudai hunuhunchha. Ali dhilo garnus.",
         "Bistarai! Kehi second pachi try garnus."
-    ],
-    'product_not_found': [
+    ),
+    'product_not_found': (
         "Tyo product bhetiyena. Arko naam le try garnus.",
         "Product khojina sakena. Different keyword use garnus."
-    ],
-    'order_not_found': [
+    ),
+    'order_not_found': (
         "Order bhetiyena. Order ID check garera feri try garnus.",
         "Tyo order chaina. Number ramrari hernus."
-    ],
-    'invalid_phone': [
+    ),
+    'invalid_phone': (
         "Thik phone number dinus (10 digits)",
         "Phone number milena. 98XXXXXXXX format ma dinus."
-    ]
+    )
 }
 
+_UNKNOWN_ERRORS = FRIENDLY_ERRORS['unknown_error']
+_randrange = random.randrange
+
 
 def get_friendly_error(
     error_type: str,
@@ -177,14 +188,11 @@ def get_friendly_error(
     Returns:
         Friendly error message
     """
-    # Try Nepali first if requested
-    if use_nepali and error_type in NEPALI_ERRORS:
-        messages = NEPALI_ERRORS[error_type]
-    else:
-        messages = FRIENDLY_ERRORS.get(error_type, FRIENDLY_ERRORS['unknown_error'])
+    # Try Nepali first if requested - one lookup per table
+    messages = (use_nepali and NEPALI_ERRORS.get(error_type)) or FRIENDLY_ERRORS.get(error_type, _UNKNOWN_ERRORS)
 
     # Get random variation for natural feel
-    message = random.choice(messages)
+    message = messages[_randrange(len(messages))]
 
     # Format with provided arguments if any
     if kwargs:
@@ -220,6 +228,7 @@ def get_error_with_suggestion(
     return message
 
 
+@lru_cache(maxsize=128)
 def get_retry_message(attempt: int, max_attempts: int) -> str:
     """
     Get message for retry attempts.
@@ -237,6 +246,7 @@ def get_retry_message(attempt: int, max_attempts: int) -> str:
         return "All attempts failed. Please try again later."
 
 
+@lru_cache(maxsize=128)
 def get_wait_message(seconds: int) -> str:
     """
     Get message for wait time.
@@ -295,12 +305,25 @@ def ai_unavailable() -> str:
     return get_friendly_error('ai_unavailable')
 
 
+# Helpful quick reply options per error type
+_QUICK_REPLIES: Dict[str, Tuple[str, ...]] = {
+    'product_not_found': ('Browse Products', 'Flash Sales', 'Categories'),
+    'order_not_found': ('Use Phone Number', 'Try Again'),
+    'invalid_order_id': ('Use Phone Number', 'Try Again'),
+    'connection_error': ('Try Again', 'Get Help'),
+    'timeout': ('Try Again', 'Get Help'),
+    'server_error': ('Try Again', 'Get Help'),
+}
+_DEFAULT_QUICK_REPLIES = ('Start Over', 'Get Help')
+
+
 # Error response builder for API
 def build_error_response(
     error_type: str,
     use_nepali: bool = False,
-    include_quick_replies: bool = True
-) -> dict:
+    include_quick_replies: bool = True,
+    serialize: bool = False
+) -> Union[dict, bytes]:
     """
     Build complete error response for API.
 
@@ -308,9 +331,10 @@ def build_error_response(
         error_type: Type of error
         use_nepali: Use Nepali message
         include_quick_replies: Include helpful quick reply options
+        serialize: Return the response encoded as JSON bytes (orjson when installed)
 
     Returns:
-        Complete error response dict
+        Complete error response dict, or its JSON bytes if serialize
     """
     message = get_friendly_error(error_type, use_nepali)
 
@@ -324,13 +348,8 @@ def build_error_response(
 
     if include_quick_replies:
         # Add contextual quick replies based on error type
-        if error_type in ['product_not_found']:
-            response['quick_replies'] = ['Browse Products', 'Flash Sales', 'Categories']
-        elif error_type in ['order_not_found', 'invalid_order_id']:
-            response['quick_replies'] = ['Use Phone Number', 'Try Again']
-        elif error_type in ['connection_error', 'timeout', 'server_error']:
-            response['quick_replies'] = ['Try Again', 'Get Help']
-        else:
-            response['quick_replies'] = ['Start Over', 'Get Help']
+        response['quick_replies'] = list(_QUICK_REPLIES.get(error_type, _DEFAULT_QUICK_REPLIES))
 
+    if serialize:
+        return _json_dumps(response)
     return response
@@ -1,14 +1,55 @@
 """
 Fuzzy Product Search for OVN Store Chatbot
-Handles typo-tolerant product search using difflib
+Handles typo-tolerant product search using rapidfuzz (or difflib)
 """
 from difflib import SequenceMatcher, get_close_matches
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 import re
+import sys
+import threading
 from dataclasses import dataclass
 
+try:
+    from rapidfuzz import fuzz as _rapidfuzz, process as _rapidfuzz_process
+except ImportError:
+    _rapidfuzz = _rapidfuzz_process = None  # Optional - falls back to difflib
 
-@dataclass
+# Characters replaced by spaces before splitting text into tokens
+_TOKEN_RE = re.compile(r'[^\w\s]')
+
+# One result object per matching product per search - use __slots__ where dataclasses support it (3.10+)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+def _ratio(a: str, b: str, floor: float = 0.0) -> float:
+    """
+    Similarity ratio (0.0 to 1.0) of two strings, or 0.0 if below floor.
+    Uses rapidfuzz's C++ ratio when installed, else difflib.SequenceMatcher -
+    whose cheap upper bounds rule out most pairs before the full ratio.
+    """
+    if _rapidfuzz is not None:
+        return _rapidfuzz.ratio(a, b, score_cutoff=floor * 100) / 100
+    matcher = SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+        return 0.0
+    return matcher.ratio()
+
+
+def _close_matches(word: str, candidates: List[str], n: int, cutoff: float) -> List[str]:
+    """
+    Best candidates with ratio >= cutoff, most similar first.
+    Drop-in for difflib.get_close_matches, backed by rapidfuzz when installed.
+    """
+    if _rapidfuzz_process is not None:
+        matches = _rapidfuzz_process.extract(
+            word, candidates, scorer=_rapidfuzz.ratio, limit=n, score_cutoff=cutoff * 100
+        )
+        return [match[0] for match in matches]
+    return get_close_matches(word, candidates, n=n, cutoff=cutoff)
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class SearchResult:
     """Search result with confidence score"""
     product: Dict
@@ -20,12 +61,19 @@ class SearchResult:
 class FuzzyProductSearch:
     """
     Typo-tolerant product search using fuzzy matching.
-    Uses Python's built-in difflib for string similarity.
+    Uses rapidfuzz for string similarity, or Python's built-in difflib without it.
     """
 
     # Minimum similarity score to consider a match
     MIN_SCORE = 0.5
 
+    # Shorter queries ("tv", "ac", "bag") only match exactly, as a substring or by
+    # word - a fuzzy ratio on two or three characters is mostly noise
+    MIN_FUZZY_QUERY_LENGTH = 4
+
+    # Distinct misspellings whose suggestions are remembered per product list
+    SUGGEST_CACHE_SIZE = 512
+
     # Field weights for scoring
     FIELD_WEIGHTS = {
         'name': 1.5,        # Product name most important
@@ -40,21 +88,95 @@ class FuzzyProductSearch:
         Args:
             products: List of product dictionaries
         """
-        self._products = products or []
+        self._products = self._unique_products(products or [])
         self._name_index = {}
+        # Per-product search fields, parallel to _products (filled by _build_index)
+        self._id_to_index: Dict = {}
+        self._names: List[str] = []
+        self._names_lc: List[str] = []
+        self._cats: List[str] = []
+        self._cats_lc: List[str] = []
+        self._descs_lc: List[str] = []
+        self._descs_display: List[str] = []
+        self._name_tokens: List[List[str]] = []
+        # Word sets of the lowercased fields, for the word-overlap check
+        self._name_words: List[frozenset] = []
+        self._cat_words: List[frozenset] = []
+        self._desc_words: List[frozenset] = []
+        self._popular: List[Dict] = []
         self._build_index()
 
     def set_products(self, products: List[Dict]) -> None:
         """Set product list and rebuild index"""
-        self._products = products
+        self._products = self._unique_products(products)
         self._build_index()
 
+    @staticmethod
+    def _unique_products(products: List[Dict]) -> List[Dict]:
+        """Drop repeated products (same id or _id), keeping the first"""
+        seen_ids = set()
+        unique = []
+        for product in products:
+            product_id = product.get('id') or product.get('_id')
+            if product_id is not None:
+                if product_id in seen_ids:
+                    continue
+                seen_ids.add(product_id)
+            unique.append(product)
+        return unique
+
     def _build_index(self) -> None:
-        """Build search index from products"""
+        """
+        Build search index from products.
+        Lowercased fields and name tokens are computed once here, in lists
+        parallel to _products, so search() does no per-product text prep.
+        """
         self._name_index = {}
-        for product in self._products:
-            name = product.get('name', '').lower()
-            self._name_index[name] = product
+        self._id_to_index = {}
+        self._names = []
+        self._names_lc = []
+        self._cats = []
+        self._cats_lc = []
+        self._descs_lc = []
+        self._descs_display = []
+        self._name_tokens = []
+        self._name_words = []
+        self._cat_words = []
+        self._desc_words = []
+
+        for i, product in enumerate(self._products):
+            name = product.get('name', '') or ''
+            category = product.get('category', '') or product.get('category_name', '') or ''
+            description = product.get('description', '') or ''
+
+            # Either ID field finds the product; the first product wins, as a scan would
+            self._id_to_index.setdefault(product.get('id'), i)
+            self._id_to_index.setdefault(product.get('_id'), i)
+            self._name_index[name.lower()] = product
+            self._names.append(name)
+            self._names_lc.append(name.lower().strip())
+            self._cats.append(category)
+            # A few category names repeat across the catalog - share one string each
+            self._cats_lc.append(sys.intern(category.lower().strip()))
+            self._descs_lc.append(description[:200].lower().strip())
+            self._descs_display.append(description[:100])
+            self._name_tokens.append(self._tokenize(name))
+            self._name_words.append(frozenset(self._names_lc[-1].split()))
+            self._cat_words.append(frozenset(self._cats_lc[-1].split()))
+            self._desc_words.append(frozenset(self._descs_lc[-1].split()))
+
+        # Sort by rating if available, otherwise by stock - fixed until the products change
+        self._popular = sorted(
+            self._products,
+            key=lambda p: (
+                p.get('rating', 0) or 0,
+                p.get('stock_quantity', 0) or 0
+            ),
+            reverse=True
+        )
+
+        # Users retry the same misspelling - a new product list starts a fresh cache
+        self._suggest_cached = lru_cache(maxsize=self.SUGGEST_CACHE_SIZE)(self._suggest_corrections_raw)
 
     def _similarity_score(self, query: str, text: str) -> float:
         """
@@ -70,8 +192,32 @@ class FuzzyProductSearch:
         if not query or not text:
             return 0.0
 
-        query = query.lower().strip()
-        text = text.lower().strip()
+        return self._similarity_score_lc(query.lower().strip(), text.lower().strip())
+
+    def _similarity_score_lc(
+        self,
+        query: str,
+        text: str,
+        query_words: frozenset = None,
+        text_words: frozenset = None,
+        floor: float = 0.0
+    ) -> float:
+        """
+        _similarity_score for query and text already lowercased and stripped.
+
+        Args:
+            query: Lowercased search query
+            text: Lowercased text to compare
+            query_words: Precomputed set(query.split()), if available
+            text_words: Precomputed set(text.split()), if available
+            floor: Score the caller needs to beat - the fuzzy ratio is skipped
+                (0.0 returned) when it provably can't reach this
+
+        Returns:
+            Similarity score between 0 and 1
+        """
+        if not query or not text:
+            return 0.0
 
         # Exact match
         if query == text:
@@ -82,8 +228,10 @@ class FuzzyProductSearch:
             return 0.9
 
         # Word-level matching
-        query_words = set(query.split())
-        text_words = set(text.split())
+        if query_words is None:
+            query_words = set(query.split())
+        if text_words is None:
+            text_words = set(text.split())
 
         # Check if any query words are in text
         common_words = query_words.intersection(text_words)
@@ -91,14 +239,20 @@ class FuzzyProductSearch:
             word_score = len(common_words) / len(query_words)
             return min(0.85, word_score)
 
-        # Use SequenceMatcher for fuzzy matching
-        return SequenceMatcher(None, query, text).ratio()
+        if len(query) < self.MIN_FUZZY_QUERY_LENGTH:
+            return 0.0
+
+        # The ratio is at most 2 * shorter / total length - skip it when even that falls short
+        if 2 * min(len(query), len(text)) < floor * (len(query) + len(text)):
+            return 0.0
+
+        # Edit-distance similarity for fuzzy matching
+        return _ratio(query, text, floor)
 
     def _tokenize(self, text: str) -> List[str]:
         """Split text into searchable tokens"""
         # Remove special characters and split
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
-        return [w for w in text.split() if len(w) >= 2]
+        return [w for w in _TOKEN_RE.sub(' ', text.lower()).split() if len(w) >= 2]
 
     def search(
         self,
@@ -123,65 +277,75 @@ class FuzzyProductSearch:
         min_score = min_score or self.MIN_SCORE
         query = query.lower().strip()
         query_tokens = self._tokenize(query)
+        query_words = frozenset(query.split())
+        weights = self.FIELD_WEIGHTS
 
-        results: List[SearchResult] = []
-        seen_ids = set()
+        # Highest score each later step can reach - once the best so far is
+        # at least that, the step can't change the result and is skipped
+        token_max = 0.7 * weights['name']
+        desc_max = max(weights['description'], token_max)
+        cat_max = max(weights['category'], desc_max)
 
-        for product in self._products:
-            product_id = product.get('id') or product.get('_id')
-            if product_id in seen_ids:
-                continue
+        results: List[SearchResult] = []
 
+        for i, product in enumerate(self._products):
             # Search in different fields
             best_score = 0.0
             best_field = ''
             best_text = ''
 
             # Search product name
-            name = product.get('name', '')
-            name_score = self._similarity_score(query, name)
-            name_score *= self.FIELD_WEIGHTS['name']
+            # A field only matters if it reaches min_score and beats the best so far
+            name = self._names[i]
+            name_score = self._similarity_score_lc(
+                query, self._names_lc[i], query_words, self._name_words[i],
+                floor=min_score / weights['name']
+            )
+            name_score *= weights['name']
             if name_score > best_score:
                 best_score = name_score
                 best_field = 'name'
                 best_text = name
 
             # Search category
-            category = product.get('category', '') or product.get('category_name', '')
-            if category:
-                cat_score = self._similarity_score(query, category)
-                cat_score *= self.FIELD_WEIGHTS['category']
+            category = self._cats[i]
+            if category and best_score < cat_max:
+                cat_score = self._similarity_score_lc(
+                    query, self._cats_lc[i], query_words, self._cat_words[i],
+                    floor=max(min_score, best_score) / weights['category']
+                )
+                cat_score *= weights['category']
                 if cat_score > best_score:
                     best_score = cat_score
                     best_field = 'category'
                     best_text = category
 
             # Search description (if exists)
-            description = product.get('description', '')
-            if description:
-                desc_score = self._similarity_score(query, description[:200])
-                desc_score *= self.FIELD_WEIGHTS['description']
+            if self._descs_lc[i] and best_score < desc_max:
+                desc_score = self._similarity_score_lc(
+                    query, self._descs_lc[i], query_words, self._desc_words[i],
+                    floor=max(min_score, best_score) / weights['description']
+                )
+                desc_score *= weights['description']
                 if desc_score > best_score:
                     best_score = desc_score
                     best_field = 'description'
-                    best_text = description[:100]
-
-            # Token-based matching
-            name_tokens = self._tokenize(name)
-            for q_token in query_tokens:
-                matches = get_close_matches(q_token, name_tokens, n=1, cutoff=0.7)
-                if matches:
-                    token_score = 0.7 * self.FIELD_WEIGHTS['name']
-                    if token_score > best_score:
-                        best_score = token_score
+                    best_text = self._descs_display[i]
+
+            # Token-based matching - one close token is enough
+            if best_score < token_max:
+                name_tokens = self._name_tokens[i]
+                for q_token in query_tokens:
+                    if _close_matches(q_token, name_tokens, n=1, cutoff=0.7):
+                        best_score = token_max
                         best_field = 'name_token'
                         best_text = name
+                        break
 
             # Normalize score to 0-1 range
             best_score = min(1.0, best_score)
 
             if best_score >= min_score:
-                seen_ids.add(product_id)
                 results.append(SearchResult(
                     product=product,
                     score=best_score,
@@ -209,13 +373,13 @@ class FuzzyProductSearch:
         Returns:
             List of products
         """
-        category = category.lower().strip()
+        # Interned like the index, so exact category matches compare by identity
+        category = sys.intern(category.lower().strip())
         results = []
 
-        for product in self._products:
-            prod_category = product.get('category', '') or product.get('category_name', '')
+        for product, prod_category in zip(self._products, self._cats_lc):
             if prod_category:
-                score = self._similarity_score(category, prod_category)
+                score = self._similarity_score_lc(category, prod_category)
                 if score >= 0.7:
                     results.append((product, score))
 
@@ -240,15 +404,28 @@ class FuzzyProductSearch:
         if not query:
             return []
 
-        query = query.lower().strip()
+        return list(self._suggest_cached(query.lower().strip(), n))
 
+    def _suggest_corrections_raw(self, query: str, n: int) -> Tuple[str, ...]:
+        """Close product names for a lowercased query (cached per product list)"""
         # Get all product names
         all_names = [p.get('name', '').lower() for p in self._products]
 
         # Find close matches
-        suggestions = get_close_matches(query, all_names, n=n, cutoff=0.5)
+        return tuple(_close_matches(query, all_names, n=n, cutoff=0.5))
+
+    def get_product(self, product_id) -> Optional[Dict]:
+        """
+        Find a product by its id or _id.
 
-        return suggestions
+        Args:
+            product_id: Product ID
+
+        Returns:
+            Product dict, or None if not found
+        """
+        index = self._id_to_index.get(product_id)
+        return self._products[index] if index is not None else None
 
     def get_popular_products(self, limit: int = 5) -> List[Dict]:
         """
@@ -260,16 +437,7 @@ class FuzzyProductSearch:
         Returns:
             List of products
         """
-        # Sort by rating if available, otherwise by stock
-        sorted_products = sorted(
-            self._products,
-            key=lambda p: (
-                p.get('rating', 0) or 0,
-                p.get('stock_quantity', 0) or 0
-            ),
-            reverse=True
-        )
-        return sorted_products[:limit]
+        return self._popular[:limit]
 
 
 class ProductSearchEngine:
@@ -332,14 +500,15 @@ class ProductSearchEngine:
         results = self.fuzzy_search.search(query, limit=limit * 2)
 
         # Apply filters
+        category_lc = category.lower() if category else None
         filtered = []
         for result in results:
             product = result.product
 
             # Category filter
-            if category:
+            if category_lc:
                 prod_cat = product.get('category', '') or product.get('category_name', '')
-                if category.lower() not in prod_cat.lower():
+                if category_lc not in prod_cat.lower():
                     continue
 
             # Price filters
@@ -381,11 +550,7 @@ class ProductSearchEngine:
             self.load_products()
 
         # Find the target product
-        target = None
-        for p in self.fuzzy_search._products:
-            if p.get('id') == product_id or p.get('_id') == product_id:
-                target = p
-                break
+        target = self.fuzzy_search.get_product(product_id)
 
         if not target:
             return []
@@ -404,13 +569,17 @@ class ProductSearchEngine:
 
 # Global search engine instance
 _search_engine: Optional[ProductSearchEngine] = None
+_search_engine_lock = threading.Lock()
 
 
 def get_search_engine(api_client=None) -> ProductSearchEngine:
-    """Get or create search engine instance"""
+    """Get or create search engine instance (the first caller's api_client is kept)"""
     global _search_engine
     if _search_engine is None:
-        _search_engine = ProductSearchEngine(api_client)
+        # Only the first requests contend - concurrent ones must not build two engines
+        with _search_engine_lock:
+            if _search_engine is None:
+                _search_engine = ProductSearchEngine(api_client)
     return _search_engine
 
 
@@ -2,6 +2,8 @@
 Intent Detection and Entity Extraction for OVN Store Chatbot
 """
 import re
+import threading
+from collections import Counter, OrderedDict
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from difflib import SequenceMatcher
@@ -10,6 +12,190 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import INTENT_KEYWORDS, ENTITY_PATTERNS
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Optional - falls back to per-keyword substring scan
+
+try:
+    from rapidfuzz.fuzz import ratio as _rapidfuzz_ratio, partial_ratio as _rapidfuzz_partial_ratio
+except ImportError:
+    _rapidfuzz_ratio = _rapidfuzz_partial_ratio = None  # Optional - falls back to difflib.SequenceMatcher
+
+
+def _build_intent_automaton(intent_keywords: Dict[str, List[str]]):
+    """
+    Compile all intent keywords into one Aho-Corasick automaton.
+
+    Args:
+        intent_keywords: {intent: [keyword, ...]}
+
+    Returns:
+        Automaton mapping keyword -> (keyword, ((intent, index), ...)),
+        or None if pyahocorasick is not installed
+    """
+    if ahocorasick is None:
+        return None
+
+    owners = {}
+    for intent, keywords in intent_keywords.items():
+        for index, keyword in enumerate(keywords):
+            owners.setdefault(keyword, []).append((intent, index))
+
+    automaton = ahocorasick.Automaton()
+    for keyword, keyword_owners in owners.items():
+        automaton.add_word(keyword.lower(), (keyword, tuple(keyword_owners)))
+    automaton.make_automaton()
+    return automaton
+
+
+# Built once at import - exact keyword detection is a single pass over the message
+_INTENT_AUTOMATON = _build_intent_automaton(INTENT_KEYWORDS)
+
+
+def _build_keyword_trigrams(intent_keywords: Dict[str, List[str]]) -> Tuple[frozenset, Tuple[str, ...]]:
+    """
+    Collect every 3-character substring of every intent keyword.
+    A message sharing none of them (and containing no keyword too short
+    to have one) cannot match any intent, exactly or fuzzily.
+
+    Args:
+        intent_keywords: {intent: [keyword, ...]}
+
+    Returns:
+        (trigrams of the keywords with and without spaces, keywords under 3 chars)
+    """
+    trigrams = set()
+    short_keywords = []
+    for keywords in intent_keywords.values():
+        for keyword in keywords:
+            keyword = keyword.lower()
+            for form in (keyword, keyword.replace(' ', '')):
+                trigrams.update(form[i:i + 3] for i in range(len(form) - 2))
+            if len(keyword) < 3:
+                short_keywords.append(keyword)
+    return frozenset(trigrams), tuple(short_keywords)
+
+
+# Gibberish ("asdfghjkl", "@#$%^&*") is rejected without scanning the keywords
+_KEYWORD_TRIGRAMS, _SHORT_KEYWORDS = _build_keyword_trigrams(INTENT_KEYWORDS)
+
+
+def _bag_overlap(counts: Counter, text: str) -> int:
+    """Number of characters text shares with counts (multiset intersection size)"""
+    text_counts = Counter(text)
+    return sum(min(count, text_counts[ch]) for ch, count in counts.items())
+
+
+def _similarity(a: str, b: str, threshold: float) -> float:
+    """
+    Similarity ratio (0.0 to 1.0) of two strings, or 0.0 if below threshold.
+    Uses rapidfuzz's C++ ratio when installed, else difflib.SequenceMatcher.
+    """
+    if _rapidfuzz_ratio is not None:
+        return _rapidfuzz_ratio(a, b, score_cutoff=threshold * 100) / 100
+    ratio = SequenceMatcher(None, a, b).ratio()
+    return ratio if ratio >= threshold else 0.0
+
+
+def _best_window_ratio(pattern: str, text: str, threshold: float) -> float:
+    """
+    First similarity ratio >= threshold between pattern and a window of
+    text of the same length, scanning left to right; 0.0 if none reaches it.
+
+    With rapidfuzz, one partial_ratio call (the best ratio over every
+    alignment, computed in C++) first rules out texts where no window can
+    reach threshold; otherwise windows are scored in order. The difflib
+    fallback can match at most as many characters as the two strings share,
+    so a sliding character-bag overlap gives an exact upper bound on the
+    ratio and windows whose bound is below threshold are skipped unscored.
+
+    Args:
+        pattern: String to look for
+        text: String to scan
+        threshold: Minimum ratio to accept
+
+    Returns:
+        Ratio of the first accepted window, or 0.0
+    """
+    size = len(pattern)
+    if not size:
+        return 1.0 if threshold <= 1.0 else 0.0
+    if len(text) < size:
+        return 0.0
+
+    if _rapidfuzz_ratio is not None:
+        cutoff = threshold * 100
+        # Upper bound for every window - most texts stop here
+        if not _rapidfuzz_partial_ratio(pattern, text, score_cutoff=cutoff):
+            return 0.0
+        for i in range(len(text) - size + 1):
+            ratio = _rapidfuzz_ratio(pattern, text[i:i + size], score_cutoff=cutoff)
+            if ratio:
+                return ratio / 100
+        return 0.0
+
+    need = Counter(pattern)
+    window = Counter(text[:size])
+    overlap = sum(min(count, window[ch]) for ch, count in need.items())
+    length = 2 * size
+
+    for i in range(len(text) - size + 1):
+        if i:
+            out_ch, in_ch = text[i - 1], text[i + size - 1]
+            if out_ch != in_ch:
+                if window[out_ch] <= need[out_ch]:
+                    overlap -= 1
+                window[out_ch] -= 1
+                window[in_ch] += 1
+                if window[in_ch] <= need[in_ch]:
+                    overlap += 1
+        if 2.0 * overlap / length < threshold:
+            continue
+        ratio = SequenceMatcher(None, pattern, text[i:i + size]).ratio()
+        if ratio >= threshold:
+            return ratio
+    return 0.0
+
+
+# Intents whose keywords usually arrive as the whole message ("hi", "thanks", "bye")
+_SINGLE_PHRASE_INTENTS = ('greeting', 'thanks', 'bye')
+
+# Entity regexes compiled once at import instead of re-parsed via the re cache per call
+_ENTITY_REGEX = {
+    name: re.compile(pattern, re.IGNORECASE)
+    for name, pattern in ENTITY_PATTERNS.items()
+}
+
+# Phone, rating, quantity and price all need a digit - one scan rules them out together
+_DIGIT_RE = re.compile(r'\d')
+
+# Product keyword candidates - words of 3+ characters, so shorter ones are never built
+_KEYWORD_TOKEN_RE = re.compile(r'\b\w{3,}\b')
+
+# Word-based ratings/quantities, checked in order as substrings of the message
+_WORD_RATINGS: Dict[str, int] = {
+    'one': 1, '1': 1,
+    'two': 2, '2': 2,
+    'three': 3, '3': 3,
+    'four': 4, '4': 4,
+    'five': 5, '5': 5
+}
+
+_WORD_QUANTITIES: Dict[str, int] = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
+}
+
+# Common words that never name a product
+_STOP_WORDS = frozenset({
+    'show', 'me', 'the', 'a', 'an', 'i', 'want', 'need', 'find', 'search',
+    'looking', 'for', 'can', 'you', 'please', 'what', 'do', 'have', 'products',
+    'product', 'all', 'everything', 'browse', 'see', 'buy', 'get', 'order',
+    'purchase', 'tell', 'about', 'more', 'details', 'info', 'is', 'are',
+    'to', 'and', 'or', 'with', 'of', 'in', 'on', 'at', 'by', 'from'
+})
+
 
 @dataclass
 class IntentResult:
@@ -37,35 +223,119 @@ class IntentDetector:
     Uses keyword matching with confidence scoring.
     """
 
+    # Typo tolerance is for short chat phrases; longer messages rely on exact
+    # matches so detection stays linear in message length
+    FUZZY_MAX_MESSAGE_LENGTH = 100
+
+    # Whole-message cache - short replies ("yes", "hi", "track my order") recur constantly
+    SCORE_CACHE_SIZE = 4096
+
     def __init__(self):
         self.intent_keywords = INTENT_KEYWORDS
+        self._automaton = _INTENT_AUTOMATON
+        # Multi-word keywords eligible for fuzzy matching, lowercased once up front
+        self._fuzzy_keywords = {
+            intent: tuple(keyword.lower() for keyword in keywords if len(keyword) > 4 and ' ' in keyword)
+            for intent, keywords in self.intent_keywords.items()
+        }
+        # Space-free form of each fuzzy keyword, matched against the space-free message
+        self._keywords_no_spaces = {
+            keyword: keyword.replace(' ', '')
+            for keywords in self._fuzzy_keywords.values()
+            for keyword in keywords
+        }
+        # Character bag of each fuzzy keyword, for the difflib path's phrase prefilter
+        self._keyword_counts = {
+            keyword: Counter(keyword)
+            for keyword in self._keywords_no_spaces
+        } if _rapidfuzz_ratio is None else {}
+        # Keyword table the substring-scan fallback last lowercased, and its lowercased form
+        self._scan_source = None
+        self._scan_keywords: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        self._score_cache: OrderedDict = OrderedDict()  # message_lower -> (intent, confidence, matches)
+        self._score_cache_lock = threading.Lock()
+        # Precomputed scores for messages that are exactly one greeting/thanks/bye keyword
+        self._phrase_scores = {
+            keyword: self._score(keyword)
+            for intent in _SINGLE_PHRASE_INTENTS
+            for keyword in self.intent_keywords.get(intent, ())
+        }
 
-    def detect(self, message: str, conversation_history: List[Dict] = None) -> IntentResult:
+    def detect(self, message: str, conversation_history: List[Dict] = None,
+               message_lower: str = None) -> IntentResult:
         """
         Detect intent from user message.
         Returns IntentResult with intent, confidence, and matched keywords.
         Uses fuzzy matching to handle typos.
+        Pass message_lower (message lowercased and stripped) if the caller already has it.
+        """
+        if message_lower is None:
+            message_lower = message.lower().strip()
+        best_intent, best_confidence, best_matches = self._score_cached(message_lower)
+
+        # Boost confidence based on conversation context
+        if conversation_history and len(conversation_history) > 0:
+            context_boost = self._get_context_boost(best_intent, conversation_history)
+            best_confidence = min(1.0, best_confidence + context_boost)
+
+        # Map to handler intents
+        best_intent = self._map_to_handler_intent(best_intent)
+
+        return IntentResult(
+            intent=best_intent,
+            confidence=best_confidence,
+            matched_keywords=list(best_matches)
+        )
+
+    def _score_cached(self, message_lower: str) -> Tuple[str, float, Tuple[str, ...]]:
+        """
+        Score a message, reusing the result for a message seen before.
+        Scoring depends only on the message text and the static INTENT_KEYWORDS.
+
+        Args:
+            message_lower: Lowercased, stripped message
+
+        Returns:
+            (intent, confidence, matched keywords) before context boost
         """
-        message_lower = message.lower().strip()
+        scored = self._phrase_scores.get(message_lower)
+        if scored is not None:
+            return scored
+
+        with self._score_cache_lock:
+            cached = self._score_cache.get(message_lower)
+            if cached is not None:
+                self._score_cache.move_to_end(message_lower)
+                return cached
+
+        scored = self._score(message_lower)
+        with self._score_cache_lock:
+            self._score_cache[message_lower] = scored
+            if len(self._score_cache) > self.SCORE_CACHE_SIZE:
+                self._score_cache.popitem(last=False)
+        return scored
+
+    def _score(self, message_lower: str) -> Tuple[str, float, Tuple[str, ...]]:
+        """Score every intent against the message and pick the best one"""
         # Clean message - remove extra spaces between words for fuzzy matching
         message_cleaned = ' '.join(message_lower.split())
+        if self.intent_keywords is INTENT_KEYWORDS and not self._shares_keyword_text(message_cleaned):
+            return 'general', 0.0, ()
         best_intent = 'general'
         best_confidence = 0.0
         best_matches = []
+        best_is_exact = False
 
-        # Check each intent - collect exact and fuzzy matches separately
-        intent_scores = {}
+        # Check each intent - exact and fuzzy matches scored separately
+        all_exact_matches = self._find_exact_matches(message_lower)
 
-        for intent, keywords in self.intent_keywords.items():
-            exact_matches = []
+        for intent in self.intent_keywords:
+            exact_matches = all_exact_matches.get(intent, [])
             fuzzy_matches = []
 
-            for keyword in keywords:
-                # First try exact match
-                if keyword in message_lower:
-                    exact_matches.append(keyword)
-                # Only try fuzzy match if no exact match AND keyword is multi-word
-                elif len(keyword) > 4 and ' ' in keyword:
+            # Fuzzy matches only count when there is no exact match
+            if not exact_matches and len(message_cleaned) <= self.FUZZY_MAX_MESSAGE_LENGTH:
+                for keyword in self._fuzzy_keywords[intent]:
                     fuzzy_score = self._fuzzy_match(keyword, message_cleaned)
                     if fuzzy_score >= 0.85:  # Stricter threshold for fuzzy
                         fuzzy_matches.append(keyword)
@@ -75,42 +345,69 @@ class IntentDetector:
                 # Big bonus for exact matches
                 confidence = self._calculate_confidence(exact_matches, message_lower, intent)
                 confidence += 0.2  # Exact match bonus
-                intent_scores[intent] = (confidence, exact_matches, True)
+                matches, is_exact = exact_matches, True
             elif fuzzy_matches:
                 confidence = self._calculate_confidence(fuzzy_matches, message_lower, intent)
-                intent_scores[intent] = (confidence, fuzzy_matches, False)
+                matches, is_exact = fuzzy_matches, False
+            else:
+                continue
 
-        # Select best intent - prefer exact matches over fuzzy
-        for intent, (confidence, matches, is_exact) in intent_scores.items():
+            # Select best intent as each is scored - prefer exact matches over fuzzy
             # If current best is fuzzy but this is exact with decent confidence, prefer exact
             if is_exact and confidence > 0.5:
-                if confidence > best_confidence or (not hasattr(self, '_best_is_exact') or not self._best_is_exact):
+                if confidence > best_confidence or not best_is_exact:
                     best_confidence = confidence
                     best_intent = intent
                     best_matches = matches
-                    self._best_is_exact = True
-            elif confidence > best_confidence and not getattr(self, '_best_is_exact', False):
+                    best_is_exact = True
+            elif confidence > best_confidence and not best_is_exact:
                 best_confidence = confidence
                 best_intent = intent
                 best_matches = matches
-                self._best_is_exact = is_exact
+                best_is_exact = is_exact
 
-        # Reset for next call
-        self._best_is_exact = False
+        return best_intent, best_confidence, tuple(best_matches)
 
-        # Boost confidence based on conversation context
-        if conversation_history and len(conversation_history) > 0:
-            context_boost = self._get_context_boost(best_intent, conversation_history)
-            best_confidence = min(1.0, best_confidence + context_boost)
+    @staticmethod
+    def _shares_keyword_text(message: str) -> bool:
+        """True if message contains any keyword trigram or short keyword"""
+        trigrams = _KEYWORD_TRIGRAMS
+        for i in range(len(message) - 2):
+            if message[i:i + 3] in trigrams:
+                return True
+        return any(keyword in message for keyword in _SHORT_KEYWORDS)
 
-        # Map to handler intents
-        best_intent = self._map_to_handler_intent(best_intent)
+    def _find_exact_matches(self, message_lower: str) -> Dict[str, List[str]]:
+        """
+        Find every intent keyword contained in the message.
 
-        return IntentResult(
-            intent=best_intent,
-            confidence=best_confidence,
-            matched_keywords=best_matches
-        )
+        Args:
+            message_lower: Lowercased message
+
+        Returns:
+            {intent: [matched keywords in INTENT_KEYWORDS order]}
+        """
+        if self._automaton is None or self.intent_keywords is not INTENT_KEYWORDS:
+            if self._scan_source is not self.intent_keywords:
+                # Lowercase each keyword once per keyword table, not once per message
+                self._scan_keywords = {
+                    intent: tuple((keyword, keyword.lower()) for keyword in keywords)
+                    for intent, keywords in self.intent_keywords.items()
+                }
+                self._scan_source = self.intent_keywords
+
+            matches = {}
+            for intent, keywords in self._scan_keywords.items():
+                found = [keyword for keyword, lowered in keywords if lowered in message_lower]
+                if found:
+                    matches[intent] = found
+            return matches
+
+        hits = {}
+        for _, (keyword, owners) in self._automaton.iter(message_lower):
+            for intent, index in owners:
+                hits.setdefault(intent, {})[index] = keyword
+        return {intent: [found[i] for i in sorted(found)] for intent, found in hits.items()}
 
     def _fuzzy_match(self, keyword: str, message: str) -> float:
         """
@@ -118,34 +415,39 @@ class IntentDetector:
         Returns similarity score (0.0 to 1.0).
         Handles typos like "check my orde rplease" matching "check my order"
         """
-        keyword_len = len(keyword)
-
         # Try sliding window approach for multi-word keywords
         words = message.split()
         message_no_spaces = message.replace(' ', '')
 
         # Check against message without spaces (handles "orde r" -> "order")
-        keyword_no_spaces = keyword.replace(' ', '')
-        for i in range(len(message_no_spaces) - len(keyword_no_spaces) + 1):
-            chunk = message_no_spaces[i:i + len(keyword_no_spaces)]
-            ratio = SequenceMatcher(None, keyword_no_spaces, chunk).ratio()
-            if ratio >= 0.85:
-                return ratio
+        keyword_no_spaces = self._keywords_no_spaces.get(keyword) or keyword.replace(' ', '')
+        ratio = _best_window_ratio(keyword_no_spaces, message_no_spaces, 0.85)
+        if ratio:
+            return ratio
 
         # Check with spaces for phrase matching
-        for i in range(len(message) - keyword_len + 1):
-            chunk = message[i:i + keyword_len + 3]  # Small buffer for typos
-            ratio = SequenceMatcher(None, keyword, chunk[:keyword_len]).ratio()
-            if ratio >= 0.8:
-                return ratio
+        ratio = _best_window_ratio(keyword, message, 0.8)
+        if ratio:
+            return ratio
 
         # Check individual word combinations for multi-word keywords
         keyword_words = keyword.split()
         if len(keyword_words) > 1:
+            # rapidfuzz's cutoff-bounded ratio is cheaper than any Python-side prefilter
+            keyword_counts = None
+            if _rapidfuzz_ratio is None:
+                keyword_counts = self._keyword_counts.get(keyword) or Counter(keyword)
+            keyword_length = len(keyword)
             for i in range(len(words) - len(keyword_words) + 1):
                 phrase = ' '.join(words[i:i + len(keyword_words)])
-                ratio = SequenceMatcher(None, keyword, phrase).ratio()
-                if ratio >= 0.75:
+                if keyword_counts is not None:
+                    # Length, then character-bag upper bounds on difflib's ratio - skip hopeless phrases
+                    total_length = keyword_length + len(phrase)
+                    if 2.0 * min(keyword_length, len(phrase)) / total_length < 0.75 or \
+                            2.0 * _bag_overlap(keyword_counts, phrase) / total_length < 0.75:
+                        continue
+                ratio = _similarity(keyword, phrase, 0.75)
+                if ratio:
                     return ratio
 
         return 0.0
@@ -238,6 +540,7 @@ class EntityExtractor:
 
     def __init__(self):
         self.patterns = ENTITY_PATTERNS
+        self.regex = _ENTITY_REGEX
 
     def extract(self, message: str, intent: str = None) -> EntityResult:
         """
@@ -247,26 +550,29 @@ class EntityExtractor:
         entities = {}
         raw_matches = {}
 
+        # Skip scans whose pattern can't match: most messages have no digits, '@' or '-'
+        has_digit = _DIGIT_RE.search(message) is not None
+
         # Phone number (Nepal format)
-        phone_matches = re.findall(self.patterns['phone_nepal'], message)
+        phone_matches = self.regex['phone_nepal'].findall(message) if has_digit else None
         if phone_matches:
             raw_matches['phone'] = phone_matches
             entities['phone'] = phone_matches[0] if len(phone_matches) == 1 else phone_matches
 
         # Order ID (short format)
-        order_short = re.findall(self.patterns['order_id_short'], message, re.IGNORECASE)
+        order_short = self.regex['order_id_short'].findall(message)
         if order_short:
             raw_matches['order_id_short'] = order_short
             entities['order_id'] = order_short[0].upper()
 
         # Order UUID (full format)
-        order_uuid = re.findall(self.patterns['order_uuid'], message, re.IGNORECASE)
+        order_uuid = self.regex['order_uuid'].findall(message) if '-' in message else None
         if order_uuid:
             raw_matches['order_uuid'] = order_uuid
             entities['order_id'] = order_uuid[0]
 
         # Rating (1-5)
-        rating_matches = re.findall(self.patterns['rating'], message, re.IGNORECASE)
+        rating_matches = self.regex['rating'].findall(message) if has_digit else None
         if rating_matches:
             raw_matches['rating'] = rating_matches
             rating = int(rating_matches[0])
@@ -274,7 +580,7 @@ class EntityExtractor:
                 entities['rating'] = rating
 
         # Quantity
-        qty_matches = re.findall(self.patterns['quantity'], message, re.IGNORECASE)
+        qty_matches = self.regex['quantity'].findall(message) if has_digit else None
         if qty_matches:
             raw_matches['quantity'] = qty_matches
             try:
@@ -285,7 +591,7 @@ class EntityExtractor:
                 pass
 
         # Price
-        price_matches = re.findall(self.patterns['price'], message, re.IGNORECASE)
+        price_matches = self.regex['price'].findall(message) if has_digit else None
         if price_matches:
             raw_matches['price'] = price_matches
             try:
@@ -295,7 +601,7 @@ class EntityExtractor:
                 pass
 
         # Email
-        email_matches = re.findall(self.patterns['email'], message, re.IGNORECASE)
+        email_matches = self.regex['email'].findall(message) if '@' in message else None
         if email_matches:
             raw_matches['email'] = email_matches
             entities['email'] = email_matches[0]
@@ -304,18 +610,18 @@ class EntityExtractor:
 
     def extract_phone(self, message: str) -> Optional[str]:
         """Extract phone number from message"""
-        matches = re.findall(self.patterns['phone_nepal'], message)
+        matches = self.regex['phone_nepal'].findall(message)
         return matches[0] if matches else None
 
     def extract_email(self, message: str) -> Optional[str]:
         """Extract email from message"""
-        matches = re.findall(self.patterns['email'], message, re.IGNORECASE)
+        matches = self.regex['email'].findall(message)
         return matches[0] if matches else None
 
     def extract_rating(self, message: str) -> Optional[int]:
         """Extract rating (1-5) from message"""
         # First check for explicit ratings
-        matches = re.findall(self.patterns['rating'], message, re.IGNORECASE)
+        matches = self.regex['rating'].findall(message)
         if matches:
             try:
                 rating = int(matches[0])
@@ -326,14 +632,7 @@ class EntityExtractor:
 
         # Check for word-based ratings
         message_lower = message.lower()
-        word_ratings = {
-            'one': 1, '1': 1,
-            'two': 2, '2': 2,
-            'three': 3, '3': 3,
-            'four': 4, '4': 4,
-            'five': 5, '5': 5
-        }
-        for word, rating in word_ratings.items():
+        for word, rating in _WORD_RATINGS.items():
             if word in message_lower:
                 return rating
 
@@ -341,7 +640,7 @@ class EntityExtractor:
 
     def extract_quantity(self, message: str) -> Optional[int]:
         """Extract quantity from message"""
-        matches = re.findall(self.patterns['quantity'], message, re.IGNORECASE)
+        matches = self.regex['quantity'].findall(message)
         if matches:
             try:
                 qty = int(matches[0])
@@ -352,11 +651,7 @@ class EntityExtractor:
 
         # Check for word-based quantities
         message_lower = message.lower()
-        word_quantities = {
-            'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-            'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
-        }
-        for word, qty in word_quantities.items():
+        for word, qty in _WORD_QUANTITIES.items():
             if word in message_lower:
                 return qty
 
@@ -364,17 +659,8 @@ class EntityExtractor:
 
     def extract_product_keywords(self, message: str) -> List[str]:
         """Extract potential product keywords from message"""
-        # Remove common stop words
-        stop_words = {
-            'show', 'me', 'the', 'a', 'an', 'i', 'want', 'need', 'find', 'search',
-            'looking', 'for', 'can', 'you', 'please', 'what', 'do', 'have', 'products',
-            'product', 'all', 'everything', 'browse', 'see', 'buy', 'get', 'order',
-            'purchase', 'tell', 'about', 'more', 'details', 'info', 'is', 'are',
-            'to', 'and', 'or', 'with', 'of', 'in', 'on', 'at', 'by', 'from'
-        }
-
-        # Extract words
-        words = re.findall(r'\b\w+\b', message.lower())
-        keywords = [w for w in words if w not in stop_words and len(w) > 2]
+        # Extract words (length filter is in the regex), dropping common stop words
+        words = _KEYWORD_TOKEN_RE.findall(message.lower())
+        keywords = [w for w in words if w not in _STOP_WORDS]
 
         return keywords
@@ -3,10 +3,16 @@ Nepali Language Support for OVN Store Chatbot
 Detects and processes Roman Nepali (Romanized Nepali/Nepali written in English)
 Responds in natural Nepali-English mix for local customers
 """
+import random
 import re
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Optional - falls back to per-phrase substring scan
+
 
 # Roman Nepali to English keyword mappings
 NEPALI_KEYWORDS: Dict[str, str] = {
@@ -275,6 +281,41 @@ NEPALI_RESPONSES: Dict[str, List[str]] = {
 }
 
 
+# Multi-word keywords, matched as substrings of the whole message
+_NEPALI_PHRASES: Tuple[str, ...] = tuple(k for k in NEPALI_KEYWORDS if ' ' in k)
+
+_NON_WORD_RE = re.compile(r'[^\w]')
+
+# Every keyword as a whole word, longest first so phrases win over their own words
+_NEPALI_KEYWORD_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(k) for k in sorted(NEPALI_KEYWORDS, key=len, reverse=True)) + r')\b'
+)
+
+
+def _build_phrase_automaton(phrases: Tuple[str, ...]):
+    """
+    Compile the multi-word Nepali keywords into one Aho-Corasick automaton.
+
+    Args:
+        phrases: Lowercase phrases to match
+
+    Returns:
+        Automaton mapping phrase -> phrase, or None if pyahocorasick is not installed
+    """
+    if ahocorasick is None:
+        return None
+
+    automaton = ahocorasick.Automaton()
+    for phrase in phrases:
+        automaton.add_word(phrase, phrase)
+    automaton.make_automaton()
+    return automaton
+
+
+# Built once at import - phrase detection is a single pass over the message
+_NEPALI_PHRASE_AUTOMATON = _build_phrase_automaton(_NEPALI_PHRASES)
+
+
 @dataclass
 class NepaliDetectionResult:
     """Result of Nepali detection"""
@@ -300,7 +341,27 @@ class NepaliDetector:
     ]
 
     def __init__(self):
-        self.patterns = [re.compile(p, re.IGNORECASE) for p in self.NEPALI_PATTERNS]
+        # One alternation with a group per pattern - a single scan finds them all
+        self.pattern = re.compile('|'.join(self.NEPALI_PATTERNS), re.IGNORECASE)
+
+    @staticmethod
+    def _find_phrases(text_lower: str) -> List[str]:
+        """
+        Find multi-word keywords in text, in NEPALI_KEYWORDS order.
+
+        Args:
+            text_lower: Lowercased message
+
+        Returns:
+            Each phrase found, once
+        """
+        # Every phrase contains a space - one-word messages ("namaste") can't hold any
+        if ' ' not in text_lower:
+            return []
+        if _NEPALI_PHRASE_AUTOMATON is None:
+            return [phrase for phrase in _NEPALI_PHRASES if phrase in text_lower]
+        hits = {phrase for _, phrase in _NEPALI_PHRASE_AUTOMATON.iter(text_lower)}
+        return [phrase for phrase in _NEPALI_PHRASES if phrase in hits]
 
     def detect(self, text: str) -> NepaliDetectionResult:
         """
@@ -317,29 +378,31 @@ class NepaliDetector:
 
         text_lower = text.lower()
         words = text_lower.split()
-        detected_words = []
-        nepali_score = 0
+        # Multi-word phrases first, so translation replaces them before their words
+        detected_words = self._find_phrases(text_lower)
+        nepali_score = 3 * len(detected_words)
+        detected_set = set(detected_words)
 
         # Check for Nepali keywords
         for word in words:
             # Remove punctuation for matching
-            clean_word = re.sub(r'[^\w]', '', word)
+            clean_word = _NON_WORD_RE.sub('', word)
 
             if clean_word in NEPALI_KEYWORDS:
-                detected_words.append(clean_word)
+                # Every occurrence scores, but each keyword is listed once
+                if clean_word not in detected_set:
+                    detected_set.add(clean_word)
+                    detected_words.append(clean_word)
                 nepali_score += 2  # Higher weight for known keywords
 
-            # Check for multi-word phrases
-            for phrase, _ in NEPALI_KEYWORDS.items():
-                if ' ' in phrase and phrase in text_lower:
-                    detected_words.append(phrase)
-                    nepali_score += 3
-
-        # Check patterns
-        for pattern in self.patterns:
-            matches = pattern.findall(text_lower)
+        # Check patterns, grouped by the pattern that matched (group number)
+        pattern_matches = [[] for _ in self.NEPALI_PATTERNS]
+        for m in self.pattern.finditer(text_lower):
+            pattern_matches[m.lastindex - 1].append(m.group(m.lastindex))
+        for matches in pattern_matches:
             for match in matches:
-                if match not in detected_words:
+                if match not in detected_set:
+                    detected_set.add(match)
                     detected_words.append(match)
                     nepali_score += 1
 
@@ -353,7 +416,7 @@ class NepaliDetector:
         is_nepali = confidence >= 0.2 or len(detected_words) >= 2
 
         # Translate detected words
-        translated_text = self._translate(text_lower, detected_words)
+        translated_text = self._translate(text_lower) if detected_words else text_lower
 
         return NepaliDetectionResult(
             is_nepali=is_nepali,
@@ -362,14 +425,10 @@ class NepaliDetector:
             translated_text=translated_text
         )
 
-    def _translate(self, text: str, detected_words: List[str]) -> str:
-        """Translate Nepali words to English equivalents"""
-        result = text
-        for word in detected_words:
-            if word in NEPALI_KEYWORDS:
-                english = NEPALI_KEYWORDS[word]
-                result = result.replace(word, english)
-        return result
+    @staticmethod
+    def _translate(text: str) -> str:
+        """Translate Nepali words to English equivalents in one pass"""
+        return _NEPALI_KEYWORD_RE.sub(lambda m: NEPALI_KEYWORDS[m.group(0)], text)
 
 
 class NepaliIntentMatcher:
@@ -433,8 +492,6 @@ class NepaliResponder:
         Returns:
             Response string
         """
-        import random
-
         if use_nepali and response_type in NEPALI_RESPONSES:
             responses = NEPALI_RESPONSES[response_type]
         else:
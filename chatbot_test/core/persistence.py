@@ -4,13 +4,14 @@ Handles chat session storage, user memory, and analytics
 """
 import os
 import sys
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from pymongo import MongoClient, DESCENDING
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import MONGO_URI, DATABASE_NAME
+from config import MONGO_URI, DATABASE_NAME, MONGO_CLIENT_OPTIONS, MAX_CONVERSATION_HISTORY
 
 
 class MongoDBConnection:
@@ -30,11 +31,7 @@ class MongoDBConnection:
             return True
 
         try:
-            self._client = MongoClient(
-                MONGO_URI,
-                serverSelectionTimeoutMS=5000,
-                connectTimeoutMS=5000
-            )
+            self._client = MongoClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
             # Test connection
             self._client.admin.command('ping')
             self._db = self._client[DATABASE_NAME]
@@ -83,6 +80,8 @@ class ChatSessionStore:
         """
         Save or update a chat session.
         Uses upsert to create if not exists.
+        If session_data has 'new_messages', only those are appended to the
+        stored conversation_history instead of rewriting the whole array.
         """
         if self.collection is None:
             return False
@@ -118,9 +117,19 @@ class ChatSessionStore:
                 'updated_at': datetime.now()
             }
 
+            update = {'$set': doc}
+            new_messages = session_data.get('new_messages')
+            if new_messages is not None:
+                del doc['conversation_history']
+                if new_messages:
+                    update['$push'] = {'conversation_history': {
+                        '$each': new_messages,
+                        '$slice': -MAX_CONVERSATION_HISTORY
+                    }}
+
             self.collection.update_one(
                 {'session_id': session_id},
-                {'$set': doc},
+                update,
                 upsert=True
             )
             return True
@@ -477,6 +486,11 @@ class AnalyticsStore:
     Collection: chat_analytics
     """
 
+    # Stats change minute-to-minute at most - reuse count_documents results briefly.
+    # Class-level so the cache survives the per-request instances get_analytics_store() returns.
+    STATS_CACHE_TTL = 60
+    _stats_cache: Dict[Tuple, Tuple[float, Dict]] = {}
+
     def __init__(self):
         self.collection_name = 'chat_analytics'
         self.session_store = ChatSessionStore()
@@ -510,11 +524,29 @@ class AnalyticsStore:
             print(f"Error recording event: {e}")
             return False
 
+    def _cached_stats(self, key: Tuple, compute: Callable[[], Dict]) -> Dict:
+        """Return stats for key from cache, recomputing after STATS_CACHE_TTL seconds"""
+        cached = self._stats_cache.get(key)
+        if cached and time.time() - cached[0] < self.STATS_CACHE_TTL:
+            return dict(cached[1])
+
+        result = compute()
+        if result:  # Don't cache the empty dict returned on errors
+            self._stats_cache[key] = (time.time(), result)
+        return dict(result)
+
     def get_daily_summary(self, date: datetime = None) -> Dict:
-        """Get analytics summary for a specific date"""
+        """Get analytics summary for a specific date (today's summary is cached briefly)"""
         if self.collection is None:
             return {}
 
+        if date is None:
+            today = datetime.now().date().isoformat()
+            return self._cached_stats(('daily_summary', today), self._compute_daily_summary)
+        return self._compute_daily_summary(date)
+
+    def _compute_daily_summary(self, date: datetime = None) -> Dict:
+        """Run the daily summary queries"""
         date = date or datetime.now()
         date_str = date.date().isoformat()
 
@@ -605,10 +637,14 @@ class AnalyticsStore:
             return []
 
     def get_conversion_stats(self, days: int = 7) -> Dict:
-        """Get conversion statistics"""
+        """Get conversion statistics (cached for STATS_CACHE_TTL seconds)"""
         if self.collection is None:
             return {}
 
+        return self._cached_stats(('conversion_stats', days), lambda: self._compute_conversion_stats(days))
+
+    def _compute_conversion_stats(self, days: int) -> Dict:
+        """Run the conversion count queries"""
         try:
             cutoff = datetime.now() - timedelta(days=days)
 
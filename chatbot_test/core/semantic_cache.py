@@ -0,0 +1,307 @@
+"""
+Semantic Response Cache for OVN Store Chatbot
+Reuses AI responses for near-duplicate user messages
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+_WORD_RE = re.compile(r'\w+')
+
+# Tokens whose exact value decides the answer - "after 10 days" vs "after 30 days",
+# "iphone 14" vs "iphone 15", "safe" vs "not safe" - yet barely move a trigram vector
+_GUARD_TOKEN_RE = re.compile(r"[\w']+")
+_NEGATIONS = frozenset({'not', 'no', 'never', 'nor', 'none', 'nothing', 'without', 'cannot'})
+
+logger = logging.getLogger(__name__)
+
+# Cached trigram weights are stored as ints in 0..QUANT_SCALE. CPython shares
+# one object per small int, so a quantized weight costs no float allocation
+QUANT_SCALE = 255
+
+
+def embed_text(text: str) -> Dict[str, float]:
+    """
+    Embed text as a unit-length character-trigram vector.
+    Lightweight stand-in for a sentence embedding - tolerant to typos,
+    word order and punctuation, with no model to load.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Sparse vector as {trigram: weight}
+    """
+    counts = Counter()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            counts[padded[i:i + 3]] += 1
+
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    if not norm:
+        return {}
+    return {gram: c / norm for gram, c in counts.items()}
+
+
+def guard_tokens(text: str) -> Tuple[str, ...]:
+    """
+    Digit-bearing tokens and negation words of text, which two messages
+    must share exactly before their similarity is even scored.
+
+    Args:
+        text: Normalized (lowercase) text
+
+    Returns:
+        Sorted tuple of guard tokens (empty if there are none)
+    """
+    guards = set()
+    for token in _GUARD_TOKEN_RE.findall(text):
+        if token in _NEGATIONS or token.endswith("n't"):
+            guards.add('not')  # "don't", "isn't" and "not" negate alike
+        elif any(ch.isdigit() for ch in token):
+            guards.add(token)
+    return tuple(sorted(guards))
+
+
+def quantize(vector: Dict[str, float]) -> Dict[str, int]:
+    """
+    Quantize a unit-length trigram vector to 8-bit integer weights.
+    The dot product of two quantized vectors is their cosine similarity
+    scaled by QUANT_SCALE ** 2, to within about 1%.
+
+    Args:
+        vector: Sparse vector from embed_text()
+
+    Returns:
+        Sparse vector as {trigram: int weight}
+    """
+    return {gram: round(weight * QUANT_SCALE) for gram, weight in vector.items()}
+
+
+def cosine_similarity(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Cosine similarity of two unit-length sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+class SemanticCache:
+    """
+    Bounded LRU cache of (intent, message embedding) -> response.
+    A lookup hits when the most similar cached message for the same intent
+    and the same guard tokens (numbers, negations) scores at or above the
+    similarity threshold and has not expired.
+    An inverted trigram index means a lookup only scores cached messages
+    that share a trigram with the query, instead of scanning every entry.
+    """
+
+    def __init__(self, max_size: int = 200, threshold: float = 0.9, ttl: float = None, path: str = None):
+        """
+        Initialize cache.
+
+        Args:
+            max_size: Maximum cached responses (least recently used evicted)
+            threshold: Minimum cosine similarity for a hit
+            ttl: Seconds a response stays valid (None = never expires)
+            path: JSON file to load from and save() to (None = memory only)
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.path = path
+        # (intent, normalized text) -> (quantized vector, response, stored_at)
+        self._entries: OrderedDict = OrderedDict()
+        # (intent, guard tokens) -> trigram -> {key: quantized weight}
+        self._postings: Dict[tuple, Dict[str, Dict[tuple, int]]] = {}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return ' '.join(text.lower().split())
+
+    @staticmethod
+    def _partition(key: tuple) -> tuple:
+        """Index partition of an entry - only entries sharing it are compared"""
+        return key[0], guard_tokens(key[1])
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _index(self, key: tuple, vector: Dict[str, int]) -> None:
+        """Add an entry's trigrams to the index (caller holds the lock)"""
+        postings = self._postings.setdefault(self._partition(key), {})
+        for gram, weight in vector.items():
+            postings.setdefault(gram, {})[key] = weight
+
+    def _remove(self, key: tuple) -> None:
+        """Drop an entry and its index postings (caller holds the lock)"""
+        vector = self._entries.pop(key)[0]
+        partition = self._partition(key)
+        postings = self._postings.get(partition, {})
+        for gram in vector:
+            keys = postings.get(gram)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del postings[gram]
+        if not postings:
+            self._postings.pop(partition, None)
+
+    def _evict(self) -> None:
+        """Drop least recently used entries over max_size (caller holds the lock)"""
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def get(self, text: str, intent: str = None) -> Optional[str]:
+        """
+        Get cached response for a similar message.
+
+        Args:
+            text: User message
+            intent: Detected intent - only responses cached for it can hit
+
+        Returns:
+            Cached response, or None on miss
+        """
+        key = (intent, self._normalize(text))
+        now = time.time()
+        with self._lock:
+            # Exact repeat - no similarity scan needed
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_expired(entry[2], now):
+                    self._remove(key)
+                else:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+
+        vector = quantize(embed_text(key[1]))
+        if not vector:
+            return None
+
+        best_key, best_score = self._most_similar(vector, self._partition(key), now)
+        if best_key is None or best_score < self.threshold:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(best_key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return entry[1]
+
+    def _most_similar(self, vector: Dict[str, int], partition: tuple, now: float) -> Tuple[Optional[tuple], float]:
+        """Find the live cached message in partition most similar to vector"""
+        scores = Counter()
+        with self._lock:
+            postings = self._postings.get(partition)
+            if not postings:
+                return None, 0.0
+            # Dot products accumulated over shared trigrams only
+            for gram, weight in vector.items():
+                for key, cached_weight in postings.get(gram, {}).items():
+                    scores[key] += weight * cached_weight
+
+            best_key, best_score = None, 0
+            for key, score in scores.items():
+                if score > best_score and not self._is_expired(self._entries[key][2], now):
+                    best_key, best_score = key, score
+        return best_key, best_score / QUANT_SCALE ** 2
+
+    def put(self, text: str, response: str, intent: str = None) -> None:
+        """
+        Cache a response for a message.
+
+        Args:
+            text: User message
+            response: Response to reuse for similar messages
+            intent: Detected intent the response was generated for
+        """
+        key = (intent, self._normalize(text))
+        vector = quantize(embed_text(key[1]))
+        if not vector or not response:
+            return
+
+        with self._lock:
+            # Same key means same text, so the indexed vector is unchanged
+            if key not in self._entries:
+                self._index(key, vector)
+            self._entries[key] = (vector, response, time.time())
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def load(self) -> None:
+        """
+        Load unexpired responses saved by save().
+        A missing or corrupt file is ignored, and so are malformed records.
+        Vectors are rebuilt from the saved text, so the file holds no internal layout.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning("Semantic cache load error: %s", e)
+            return
+        if not isinstance(saved, list):
+            logger.warning("Semantic cache load error: expected a list of entries")
+            return
+
+        now = time.time()
+        with self._lock:
+            for record in saved:
+                try:
+                    intent, text = record['intent'], record['text']
+                    response, stored_at = record['response'], float(record['stored_at'])
+                except (TypeError, KeyError, ValueError):
+                    continue
+                if not (isinstance(text, str) and isinstance(response, str) and response
+                        and (intent is None or isinstance(intent, str))):
+                    continue
+                if self._is_expired(stored_at, now):
+                    continue
+                key = (intent, self._normalize(text))
+                vector = quantize(embed_text(key[1]))
+                if not vector:
+                    continue
+                if key not in self._entries:
+                    self._index(key, vector)
+                self._entries[key] = (vector, response, stored_at)
+            self._evict()
+
+    def save(self) -> None:
+        """Write cached responses to path so they survive a restart"""
+        if not self.path:
+            return
+        with self._lock:
+            records = [
+                {'intent': key[0], 'text': key[1], 'response': entry[1], 'stored_at': entry[2]}
+                for key, entry in self._entries.items()
+            ]
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Semantic cache save error: %s", e)
+
+    def clear(self) -> None:
+        """Drop all cached responses"""
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
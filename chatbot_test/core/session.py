@@ -3,15 +3,21 @@ Session Management for OVN Store Chatbot
 Handles user session memory and conversation context
 Now with MongoDB persistence for chat history
 """
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List, Any
+from itertools import islice
+from typing import Deque, Dict, Optional, List, Any
 from enum import Enum
 import sys
 import os
+import threading
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import SESSION_TIMEOUT_MINUTES, MAX_CONVERSATION_HISTORY
 
+# One session object per live chat - use __slots__ where dataclasses support it (3.10+)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 # Import persistence layer (lazy loading to avoid circular imports)
 _persistence_loaded = False
 _session_store = None
@@ -75,7 +81,7 @@ class ConversationState(Enum):
     REVIEW_CONFIRMING = "review_confirming"
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class SessionData:
     """Stores all data for a user session"""
     session_id: str
@@ -101,12 +107,22 @@ class SessionData:
     selected_products: List[Dict] = field(default_factory=list)
     last_viewed_products: List[Dict] = field(default_factory=list)
 
-    # Conversation history
-    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    # Conversation history (bounded - oldest messages drop off automatically)
+    conversation_history: Deque[Dict[str, str]] = field(
+        default_factory=lambda: deque(maxlen=MAX_CONVERSATION_HISTORY)
+    )
 
     # Preferences learned from conversation
     preferences: Dict[str, Any] = field(default_factory=dict)
 
+    # Live admin takeover
+    admin_handling: bool = False
+    admin_id: Optional[int] = None
+
+    # History persistence bookkeeping - once the stored history matches, saves only append new messages
+    _history_synced: bool = field(default=False, repr=False)
+    _history_unsaved: int = field(default=0, repr=False)
+
     def update_activity(self):
         """Update last activity timestamp"""
         self.last_activity = datetime.now()
@@ -118,13 +134,12 @@ class SessionData:
             "content": content,
             "timestamp": datetime.now().isoformat()
         })
-        # Keep only last N messages
-        if len(self.conversation_history) > MAX_CONVERSATION_HISTORY:
-            self.conversation_history = self.conversation_history[-MAX_CONVERSATION_HISTORY:]
+        self._history_unsaved += 1
 
     def get_recent_history(self, count: int = 6) -> List[Dict]:
         """Get recent conversation history for AI context"""
-        return self.conversation_history[-count:]
+        start = max(0, len(self.conversation_history) - count)
+        return list(islice(self.conversation_history, start, None))
 
     def remember_user_info(self, **kwargs):
         """Update user info from conversation"""
@@ -202,11 +217,11 @@ class SessionData:
             'user_id': self.user_id,
             'selected_products': self.selected_products,
             'last_viewed_products': self.last_viewed_products,
-            'conversation_history': self.conversation_history,
+            'conversation_history': list(self.conversation_history),
             'preferences': self.preferences,
             'is_active': True,
-            'admin_handling': getattr(self, 'admin_handling', False),
-            'admin_id': getattr(self, 'admin_id', None)
+            'admin_handling': self.admin_handling,
+            'admin_id': self.admin_id
         }
 
     @classmethod
@@ -242,8 +257,12 @@ class SessionData:
         # Products and history
         session.selected_products = data.get('selected_products', [])
         session.last_viewed_products = data.get('last_viewed_products', [])
-        session.conversation_history = data.get('conversation_history', [])
+        session.conversation_history = deque(
+            data.get('conversation_history', []),
+            maxlen=MAX_CONVERSATION_HISTORY
+        )
         session.preferences = data.get('preferences', {})
+        session._history_synced = True
 
         # Admin handling
         session.admin_handling = data.get('admin_handling', False)
@@ -254,9 +273,20 @@ class SessionData:
     def save_to_db(self) -> bool:
         """Save session to MongoDB"""
         session_store, _, _ = _load_persistence()
-        if session_store:
-            return session_store.save_session(self.to_full_dict())
-        return False
+        if not session_store:
+            return False
+
+        data = self.to_full_dict()
+        unsaved = min(self._history_unsaved, len(self.conversation_history))
+        if self._history_synced:
+            # Stored history is current up to the unsaved tail - push just that
+            data['new_messages'] = data['conversation_history'][len(data['conversation_history']) - unsaved:]
+
+        saved = session_store.save_session(data)
+        if saved:
+            self._history_synced = True
+            self._history_unsaved -= unsaved
+        return saved
 
     def record_analytics_event(self, event_type: str, intent: str = None, metadata: Dict = None) -> bool:
         """Record analytics event for this session"""
@@ -278,6 +308,8 @@ class SessionManager:
         self.sessions: Dict[str, SessionData] = {}
         self.timeout = timedelta(minutes=timeout_minutes)
         self.use_persistence = use_persistence
+        # Guards structural changes to self.sessions (safe to share across threads)
+        self._lock = threading.Lock()
 
     def get_or_create(self, session_id: str, phone: str = None) -> SessionData:
         """
@@ -301,8 +333,8 @@ class SessionManager:
             if session_store:
                 db_session = session_store.load_session(session_id)
                 if db_session:
-                    session = SessionData.from_dict(db_session)
-                    self.sessions[session_id] = session
+                    with self._lock:
+                        session = self.sessions.setdefault(session_id, SessionData.from_dict(db_session))
                     session.update_activity()
                     return session
 
@@ -322,13 +354,12 @@ class SessionManager:
                         'total_orders': memory.get('total_orders', 0),
                         'categories_interested': memory.get('categories_interested', [])
                     }
-                    self.sessions[session_id] = session
-                    return session
+                    with self._lock:
+                        return self.sessions.setdefault(session_id, session)
 
         # Create new session
-        session = SessionData(session_id=session_id)
-        self.sessions[session_id] = session
-        return session
+        with self._lock:
+            return self.sessions.setdefault(session_id, SessionData(session_id=session_id))
 
     def get(self, session_id: str) -> Optional[SessionData]:
         """Get session if exists (memory only)"""
@@ -342,7 +373,8 @@ class SessionManager:
                 session_store, _, _ = _load_persistence()
                 if session_store:
                     session_store.mark_inactive(session_id)
-            del self.sessions[session_id]
+            with self._lock:
+                self.sessions.pop(session_id, None)
 
     def save_session(self, session_id: str) -> bool:
         """Explicitly save session to MongoDB"""
@@ -354,7 +386,9 @@ class SessionManager:
         """Save all sessions to MongoDB (useful before shutdown)"""
         saved = 0
         if self.use_persistence:
-            for session in self.sessions.values():
+            with self._lock:
+                sessions = list(self.sessions.values())
+            for session in sessions:
                 if session.save_to_db():
                     saved += 1
         return saved
@@ -362,16 +396,16 @@ class SessionManager:
     def cleanup_expired(self):
         """Remove sessions older than timeout"""
         now = datetime.now()
-        expired = [
-            sid for sid, session in self.sessions.items()
-            if now - session.last_activity > self.timeout
-        ]
-        for sid in expired:
-            # Save to DB before removing from memory
-            if self.use_persistence:
-                session = self.sessions[sid]
+        with self._lock:
+            expired = [
+                sid for sid, session in self.sessions.items()
+                if now - session.last_activity > self.timeout
+            ]
+            expired_sessions = [self.sessions.pop(sid) for sid in expired]
+        # Save to DB after removing from memory (outside the lock)
+        if self.use_persistence:
+            for session in expired_sessions:
                 session.save_to_db()
-            del self.sessions[sid]
 
     def get_active_sessions_count(self) -> int:
         """Get count of active sessions"""
@@ -389,7 +423,8 @@ class SessionManager:
     def get_all_active_sessions(self) -> List[SessionData]:
         """Get all active sessions (for admin)"""
         self.cleanup_expired()
-        return list(self.sessions.values())
+        with self._lock:
+            return list(self.sessions.values())
 
     def set_admin_handling(self, session_id: str, admin_id: int, handling: bool) -> bool:
         """Set admin handling status for a session"""
@@ -13,6 +13,11 @@ from core.session import SessionData, ConversationState
 from api.django_client import DjangoAPIClient
 from config import QUICK_REPLIES
 
+# Exact replies recognised without calling the AI
+_QUICK_CONFIRMATIONS = frozenset({'yes', 'y', 'yeah', 'yep', 'yup', 'ok', 'okay', 'sure', 'ha', 'ho'})
+_QUICK_REJECTIONS = frozenset({'no', 'n', 'nope', 'nah', 'cancel', 'hoina'})
+_SKIP_WORDS = frozenset({'skip', 'none', 'no', 'n/a', 'na', '-', 'nothing'})
+
 # Lazy import AI engine to avoid circular imports
 _ai_engine = None
 
@@ -82,17 +87,13 @@ class BaseHandler(ABC):
         msg = message.lower().strip()
 
         # Quick exact matches first (no AI needed)
-        quick_confirmations = ['yes', 'y', 'yeah', 'yep', 'yup', 'ok', 'okay', 'sure', 'ha', 'ho']
-        if msg in quick_confirmations:
+        if msg in _QUICK_CONFIRMATIONS:
             return True
 
-        # For anything else, use AI to interpret
+        # For anything else, match yes/no patterns, then use AI to interpret
         try:
-            ai = get_ai_engine()
-            if ai.is_available():
-                result = ai.interpret_user_response(message, "confirmation")
-                if result.get("type") == "confirmation" and result.get("confidence", 0) > 0.6:
-                    return True
+            if get_ai_engine().is_confirmation_ai(message):
+                return True
         except Exception as e:
             print(f"AI confirmation check error: {e}")
 
@@ -106,17 +107,13 @@ class BaseHandler(ABC):
         msg = message.lower().strip()
 
         # Quick exact matches first (no AI needed)
-        quick_rejections = ['no', 'n', 'nope', 'nah', 'cancel', 'hoina']
-        if msg in quick_rejections:
+        if msg in _QUICK_REJECTIONS:
             return True
 
-        # For anything else, use AI to interpret
+        # For anything else, match yes/no patterns, then use AI to interpret
         try:
-            ai = get_ai_engine()
-            if ai.is_available():
-                result = ai.interpret_user_response(message, "rejection")
-                if result.get("type") == "rejection" and result.get("confidence", 0) > 0.6:
-                    return True
+            if get_ai_engine().is_rejection_ai(message):
+                return True
         except Exception as e:
             print(f"AI rejection check error: {e}")
 
@@ -127,8 +124,7 @@ class BaseHandler(ABC):
 
     def is_skip(self, message: str) -> bool:
         """Check if user wants to skip"""
-        skips = ['skip', 'none', 'no', 'n/a', 'na', '-', 'nothing']
-        return message.lower().strip() in skips
+        return message.lower().strip() in _SKIP_WORDS
 
     def format_price(self, price: float) -> str:
         """Format price for display"""
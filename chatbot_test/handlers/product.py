@@ -3,15 +3,97 @@ Product Handler for OVN Store Chatbot
 Handles product search, browsing, and display
 """
 import re
+import threading
+import time
 from typing import Dict, List, Optional
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, TEXT, ReadPreference
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from .base import BaseHandler, HandlerResponse
 from core.session import SessionData, ConversationState
-from config import MONGO_URI, DATABASE_NAME
+from config import MONGO_URI, DATABASE_NAME, MONGO_CLIENT_OPTIONS
+
+# Stop words stripped from search/detail queries (built once at import)
+_SEARCH_STOPWORDS = frozenset({
+    'show', 'me', 'the', 'a', 'an', 'i', 'want', 'need', 'find', 'search',
+    'looking', 'for', 'can', 'you', 'please', 'what', 'do', 'have', 'products',
+    'product', 'all', 'everything', 'browse', 'see', 'buy', 'get', 'order',
+    'to', 'it', 'this', 'that', 'is', 'are', 'and', 'or',
+    'details', 'about', 'know', 'info', 'information', 'tell', 'give',
+    'th', 'of', 'more', 'some', 'any'
+})
+
+_DETAIL_STOPWORDS = frozenset({
+    'tell', 'me', 'more', 'about', 'the', 'a', 'an', 'what', 'is',
+    'details', 'detail', 'info', 'information', 'describe', 'show'
+})
+
+
+# Every ASCII non-word character -> space, so str.split() tokenizes like \w+
+_NON_WORD_TABLE = str.maketrans({
+    c: ' ' for c in map(chr, range(128)) if not (c.isalnum() or c == '_')
+})
+_WORD_RE = re.compile(r'\w+')
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into words: translate+split for ASCII, regex fallback for unicode"""
+    if text.isascii():
+        return text.translate(_NON_WORD_TABLE).split()
+    return _WORD_RE.findall(text)
+
+
+# Only the fields format_product reads - keeps large embedded arrays off the wire
+_PRODUCT_PROJECTION = {
+    "django_id": 1, "name": 1, "price": 1, "compare_price": 1,
+    "flash_sale_price": 1, "is_flash_sale": 1, "main_image": 1,
+    "category_name": 1, "stock_quantity": 1, "avg_rating": 1,
+    "review_count": 1, "is_featured": 1, "description": 1, "_id": 0
+}
+
+_FEATURED_FILTER = {
+    "is_active": True,
+    "$or": [{"is_featured": True}, {"is_flash_sale": True}]
+}
+
+
+def _format_product(product: Dict, _float=float) -> Dict:
+    """
+    Format a MongoDB product document for the chat UI.
+    Module-level (not a method) so bulk formatting via map() skips the
+    self lookup; float is bound as a default arg for a fast local lookup.
+    """
+    get = product.get
+    regular_price = _float(get("price", 0))
+    compare = get("compare_price")
+    flash = get("flash_sale_price")
+    special_price = _float(compare) if compare else None
+    flash_price = _float(flash) if flash else None
+
+    # Display price falls through flash -> special -> regular
+    display_price = flash_price or special_price or regular_price
+    if flash_price:
+        original_price = special_price or regular_price
+    else:
+        original_price = regular_price if special_price else 0
+
+    return {
+        "id": get("django_id", ""),
+        "name": get("name", ""),
+        "price": display_price,
+        "compare_price": original_price,
+        "flash_sale_price": flash_price,
+        "image": get("main_image", ""),
+        "category": get("category_name", "General"),
+        "stock": get("stock_quantity", 0),
+        "rating": get("avg_rating", 0),
+        "review_count": get("review_count", 0),
+        "is_featured": get("is_featured", False),
+        "is_flash_sale": get("is_flash_sale", False),
+        "description": (get("description", "") or "")[:100]
+    }
 
 
 class ProductHandler(BaseHandler):
@@ -24,12 +106,38 @@ class ProductHandler(BaseHandler):
     - Product details
     """
 
+    # Categories rarely change - reuse the list for this many seconds
+    CATEGORY_CACHE_TTL = 300
+    # Featured / all-products listings are reused briefly (stock and prices change)
+    PRODUCT_CACHE_TTL = 60
+    FEATURED_PREFETCH = 10
+    ALL_PRODUCTS_PREFETCH = 20
+
+    # One pooled client shared by every ProductHandler (chat, order and review handlers)
+    _shared_client = None
+    _shared_client_lock = threading.Lock()
+
+    @classmethod
+    def _get_client(cls) -> MongoClient:
+        """Get the process-wide pooled MongoClient, creating it on first use"""
+        if cls._shared_client is None:
+            with cls._shared_client_lock:
+                if cls._shared_client is None:
+                    cls._shared_client = MongoClient(MONGO_URI, **MONGO_CLIENT_OPTIONS)
+        return cls._shared_client
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._cat_cache = None
+        self._cat_cache_ts = 0.0
+        # (fetched_at, fetched_limit, formatted_products)
+        self._featured_cache = None
+        self._all_products_cache = None
         # Initialize MongoDB connection
         try:
-            self.client = MongoClient(MONGO_URI)
-            self.db = self.client[DATABASE_NAME]
+            self.client = self._get_client()
+            # Catalog reads tolerate slight staleness - read from the nearest member
+            self.db = self.client.get_database(DATABASE_NAME, read_preference=ReadPreference.NEAREST)
             self.products_col = self.db['products']
             self.categories_col = self.db['categories']
             self.db_connected = True
@@ -37,6 +145,72 @@ class ProductHandler(BaseHandler):
             print(f"MongoDB connection failed: {e}")
             self.db_connected = False
 
+        if self.db_connected:
+            self._ensure_indexes()
+            self._load_initial()
+
+    def _ensure_indexes(self):
+        """Create indexes used by the search/featured/category queries (idempotent)"""
+        try:
+            self.products_col.create_index(
+                [('name', TEXT), ('description', TEXT), ('category_name', TEXT)],
+                default_language='english'
+            )
+            self.products_col.create_index([('is_active', ASCENDING), ('is_featured', ASCENDING)])
+            self.products_col.create_index([('is_active', ASCENDING), ('category_name', ASCENDING)])
+        except Exception as e:
+            print(f"MongoDB index creation failed: {e}")
+
+    def _load_initial(self):
+        """
+        Warm the category, featured and all-products caches in one round-trip
+        using a single $facet aggregation (categories come in via $lookup).
+        """
+        pipeline = [{"$facet": {
+            "cats": [
+                {"$limit": 1},
+                {"$lookup": {
+                    "from": "categories",
+                    "pipeline": [{"$project": {"_id": 0, "name": 1}}],
+                    "as": "items"
+                }},
+                {"$project": {"_id": 0, "items": 1}}
+            ],
+            "featured": [
+                {"$match": _FEATURED_FILTER},
+                {"$limit": self.FEATURED_PREFETCH},
+                {"$project": _PRODUCT_PROJECTION}
+            ],
+            "all": [
+                {"$match": {"is_active": True}},
+                {"$limit": self.ALL_PRODUCTS_PREFETCH},
+                {"$project": _PRODUCT_PROJECTION}
+            ]
+        }}]
+        try:
+            result = next(self.products_col.aggregate(pipeline), None)
+        except Exception as e:
+            print(f"Initial product load failed: {e}")
+            return
+        if not result:
+            return
+
+        now = time.time()
+        if result["cats"]:
+            self._cat_cache = [cat["name"] for cat in result["cats"][0]["items"]]
+            self._cat_cache_ts = now
+        self._featured_cache = (now, self.FEATURED_PREFETCH, list(map(_format_product, result["featured"])))
+        self._all_products_cache = (now, self.ALL_PRODUCTS_PREFETCH, list(map(_format_product, result["all"])))
+
+    def _cached_products(self, cache, limit: int) -> Optional[List[Dict]]:
+        """Serve up to limit products from a (fetched_at, fetched_limit, products) cache if fresh"""
+        if cache is None:
+            return None
+        fetched_at, fetched_limit, products = cache
+        if limit > fetched_limit or time.time() - fetched_at >= self.PRODUCT_CACHE_TTL:
+            return None
+        return [dict(p) for p in products[:limit]]
+
     def can_handle(self, intent: str, state: ConversationState) -> bool:
         """Handle product-related intents when in IDLE state"""
         product_intents = ['product_search', 'flash_sale', 'categories', 'product_detail']
@@ -125,18 +299,20 @@ class ProductHandler(BaseHandler):
             rating = formatted.get('rating', 0)
             review_count = formatted.get('review_count', 0)
 
-            response_text = f"**{name}**\n\n"
+            # Collect the pieces and join once instead of repeated string concatenation
+            parts = [f"**{name}**\n\n"]
             if desc:
-                response_text += f"{desc}...\n\n"
-            response_text += f"**Price:** {self.format_price(price)}"
+                parts.append(f"{desc}...\n\n")
+            parts.append(f"**Price:** {self.format_price(price)}")
             if compare and compare > price:
-                response_text += f" ~~{self.format_price(compare)}~~"
-            response_text += f"\n**Category:** {category}"
-            response_text += f"\n**Stock:** {'In Stock ✅' if stock > 0 else 'Out of Stock ❌'}"
+                parts.append(f" ~~{self.format_price(compare)}~~")
+            parts.append(f"\n**Category:** {category}")
+            parts.append(f"\n**Stock:** {'In Stock ✅' if stock > 0 else 'Out of Stock ❌'}")
             if rating > 0:
                 stars = '★' * int(rating) + '☆' * (5 - int(rating))
-                response_text += f"\n**Rating:** {stars} ({rating}/5 - {review_count} reviews)"
-            response_text += f"\n\nClick the product card below to buy!"
+                parts.append(f"\n**Rating:** {stars} ({rating}/5 - {review_count} reviews)")
+            parts.append("\n\nClick the product card below to buy!")
+            response_text = "".join(parts)
 
             return self.response(
                 response_text,
@@ -153,45 +329,21 @@ class ProductHandler(BaseHandler):
 
     def format_product(self, product: Dict) -> Dict:
         """Format a MongoDB product document"""
-        regular_price = float(product.get("price", 0))
-        special_price = float(product.get("compare_price")) if product.get("compare_price") else None
-        flash_price = float(product.get("flash_sale_price")) if product.get("flash_sale_price") else None
-        is_flash_sale = product.get("is_flash_sale", False)
-
-        # Determine display price
-        if flash_price:
-            display_price = flash_price
-            original_price = special_price if special_price else regular_price
-        elif special_price:
-            display_price = special_price
-            original_price = regular_price
-        else:
-            display_price = regular_price
-            original_price = 0
-
-        return {
-            "id": product.get("django_id", ""),
-            "name": product.get("name", ""),
-            "price": display_price,
-            "compare_price": original_price,
-            "flash_sale_price": flash_price,
-            "image": product.get("main_image", ""),
-            "category": product.get("category_name", "General"),
-            "stock": product.get("stock_quantity", 0),
-            "rating": product.get("avg_rating", 0),
-            "review_count": product.get("review_count", 0),
-            "is_featured": product.get("is_featured", False),
-            "is_flash_sale": is_flash_sale,
-            "description": (product.get("description", "") or "")[:100]
-        }
+        return _format_product(product)
 
     def get_all_products(self, limit: int = 20) -> List[Dict]:
         """Get all active products"""
         if not self.db_connected:
             return []
+        cached = self._cached_products(self._all_products_cache, limit)
+        if cached is not None:
+            return cached
         try:
-            products = self.products_col.find({"is_active": True}).limit(limit)
-            return [self.format_product(p) for p in products]
+            fetch = max(limit, self.ALL_PRODUCTS_PREFETCH)
+            products = self.products_col.find({"is_active": True}, _PRODUCT_PROJECTION).limit(fetch)
+            formatted = list(map(_format_product, products))
+            self._all_products_cache = (time.time(), fetch, formatted)
+            return [dict(p) for p in formatted[:limit]]
         except Exception as e:
             print(f"Error: {e}")
             return []
@@ -200,12 +352,15 @@ class ProductHandler(BaseHandler):
         """Get featured/flash sale products"""
         if not self.db_connected:
             return []
+        cached = self._cached_products(self._featured_cache, limit)
+        if cached is not None:
+            return cached
         try:
-            products = self.products_col.find({
-                "is_active": True,
-                "$or": [{"is_featured": True}, {"is_flash_sale": True}]
-            }).limit(limit)
-            return [self.format_product(p) for p in products]
+            fetch = max(limit, self.FEATURED_PREFETCH)
+            products = self.products_col.find(_FEATURED_FILTER, _PRODUCT_PROJECTION).limit(fetch)
+            formatted = list(map(_format_product, products))
+            self._featured_cache = (time.time(), fetch, formatted)
+            return [dict(p) for p in formatted[:limit]]
         except Exception as e:
             print(f"Error: {e}")
             return []
@@ -219,7 +374,7 @@ class ProductHandler(BaseHandler):
             exact_match = self.products_col.find_one({
                 "is_active": True,
                 "name": {"$regex": f"^{re.escape(query[:50])}.*", "$options": "i"}
-            })
+            }, _PRODUCT_PROJECTION)
             if exact_match:
                 return [self.format_product(exact_match)]
 
@@ -229,34 +384,15 @@ class ProductHandler(BaseHandler):
             query_clean = re.sub(r'(\d+)(ml|l|g|kg|oz|cm|mm|inch)', r'\1 \2', query_clean)
             query_clean = re.sub(r'(\d+)([a-zA-Z])', r'\1 \2', query_clean)
 
-            keywords = re.findall(r'\b\w+\b', query_clean)
-            stop_words = {'show', 'me', 'the', 'a', 'an', 'i', 'want', 'need', 'find', 'search',
-                         'looking', 'for', 'can', 'you', 'please', 'what', 'do', 'have', 'products',
-                         'product', 'all', 'everything', 'browse', 'see', 'buy', 'get', 'order',
-                         'to', 'it', 'this', 'that', 'is', 'are', 'and', 'or',
-                         'details', 'about', 'know', 'info', 'information', 'tell', 'give',
-                         'th', 'of', 'more', 'some', 'any'}
-            keywords = [k for k in keywords if k not in stop_words and len(k) > 1]
+            keywords = [w for w in _tokenize(query_clean) if len(w) >= 2 and w not in _SEARCH_STOPWORDS]
 
             if not keywords:
                 return self.get_all_products(limit)
 
-            # Build query with flexible matching
-            regex_patterns = []
-            for keyword in keywords:
-                # Create flexible regex that handles variations
-                # "clover" matches "clover", "220clover" matches "220.*clover" or "220 ml clover"
-                flex_pattern = f".*{re.escape(keyword)}.*"
-                regex_patterns.append({"name": {"$regex": flex_pattern, "$options": "i"}})
-                regex_patterns.append({"description": {"$regex": flex_pattern, "$options": "i"}})
-                regex_patterns.append({"category_name": {"$regex": flex_pattern, "$options": "i"}})
-
-            query_filter = {"is_active": True, "$or": regex_patterns}
-
-            if max_price:
-                query_filter["price"] = {"$lte": max_price}
-
-            products = list(self.products_col.find(query_filter).limit(limit * 2))
+            # Indexed full-text search first; regex scan only when it finds nothing
+            products = self._text_search(keywords, max_price, limit * 2)
+            if not products:
+                products = self._regex_search(keywords, max_price, limit * 2)
 
             # Score and rank products by relevance
             scored_products = []
@@ -277,11 +413,44 @@ class ProductHandler(BaseHandler):
 
             # Sort by score descending
             scored_products.sort(key=lambda x: x[0], reverse=True)
-            return [self.format_product(p) for _, p in scored_products[:limit]]
+            return [_format_product(p) for _, p in scored_products[:limit]]
         except Exception as e:
             print(f"Error: {e}")
             return []
 
+    def _text_search(self, keywords: List[str], max_price: float, limit: int) -> List[Dict]:
+        """Search products via the $text index, best textScore first"""
+        query_filter = {"is_active": True, "$text": {"$search": " ".join(keywords)}}
+        if max_price:
+            query_filter["price"] = {"$lte": max_price}
+        try:
+            cursor = self.products_col.find(
+                query_filter, {**_PRODUCT_PROJECTION, "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).limit(limit)
+            return list(cursor)
+        except Exception as e:
+            print(f"Text search failed: {e}")
+            return []
+
+    def _regex_search(self, keywords: List[str], max_price: float, limit: int) -> List[Dict]:
+        """Substring regex search (unindexed) - catches partial words like '220clover'"""
+        # Build query with flexible matching
+        regex_patterns = []
+        for keyword in keywords:
+            # Create flexible regex that handles variations
+            # "clover" matches "clover", "220clover" matches "220.*clover" or "220 ml clover"
+            flex_pattern = f".*{re.escape(keyword)}.*"
+            regex_patterns.append({"name": {"$regex": flex_pattern, "$options": "i"}})
+            regex_patterns.append({"description": {"$regex": flex_pattern, "$options": "i"}})
+            regex_patterns.append({"category_name": {"$regex": flex_pattern, "$options": "i"}})
+
+        query_filter = {"is_active": True, "$or": regex_patterns}
+
+        if max_price:
+            query_filter["price"] = {"$lte": max_price}
+
+        return list(self.products_col.find(query_filter, _PRODUCT_PROJECTION).limit(limit))
+
     def get_products_by_category(self, category_name: str, limit: int = 10) -> List[Dict]:
         """Get products by category"""
         if not self.db_connected:
@@ -290,19 +459,23 @@ class ProductHandler(BaseHandler):
             products = self.products_col.find({
                 "is_active": True,
                 "category_name": {"$regex": category_name, "$options": "i"}
-            }).limit(limit)
-            return [self.format_product(p) for p in products]
+            }, _PRODUCT_PROJECTION).limit(limit)
+            return list(map(_format_product, products))
         except Exception as e:
             print(f"Error: {e}")
             return []
 
     def get_all_categories(self) -> List[str]:
-        """Get all category names"""
+        """Get all category names (cached for CATEGORY_CACHE_TTL seconds)"""
         if not self.db_connected:
             return []
+        if self._cat_cache is not None and time.time() - self._cat_cache_ts < self.CATEGORY_CACHE_TTL:
+            return list(self._cat_cache)
         try:
             categories = self.categories_col.find({}, {"name": 1})
-            return [cat["name"] for cat in categories]
+            self._cat_cache = [cat["name"] for cat in categories]
+            self._cat_cache_ts = time.time()
+            return list(self._cat_cache)
         except:
             return []
 
@@ -311,25 +484,18 @@ class ProductHandler(BaseHandler):
         if not self.db_connected:
             return None
         try:
-            keywords = re.findall(r'\b\w+\b', query.lower())
-            stop_words = {'tell', 'me', 'more', 'about', 'the', 'a', 'an', 'what', 'is',
-                         'details', 'detail', 'info', 'information', 'describe', 'show'}
-            keywords = [k for k in keywords if k not in stop_words and len(k) > 2]
+            keywords = [w for w in _tokenize(query.lower()) if len(w) >= 3 and w not in _DETAIL_STOPWORDS]
 
             if not keywords:
                 return None
 
-            for keyword in keywords:
-                product = self.products_col.find_one({
-                    "is_active": True,
-                    "$or": [
-                        {"name": {"$regex": keyword, "$options": "i"}},
-                        {"description": {"$regex": keyword, "$options": "i"}}
-                    ]
-                })
-                if product:
-                    return product
-            return None
+            # One round-trip: match any keyword in name or description
+            or_clauses = [{"name": {"$regex": k, "$options": "i"}} for k in keywords]
+            or_clauses += [{"description": {"$regex": k, "$options": "i"}} for k in keywords]
+            return self.products_col.find_one({
+                "is_active": True,
+                "$or": or_clauses
+            }, _PRODUCT_PROJECTION)
         except Exception as e:
             print(f"Error: {e}")
             return None
@@ -339,7 +505,7 @@ class ProductHandler(BaseHandler):
         if not self.db_connected:
             return None
         try:
-            product = self.products_col.find_one({"django_id": product_id, "is_active": True})
+            product = self.products_col.find_one({"django_id": product_id, "is_active": True}, _PRODUCT_PROJECTION)
             return self.format_product(product) if product else None
         except Exception as e:
             print(f"Error: {e}")
@@ -359,13 +525,12 @@ class ProductHandler(BaseHandler):
             product = self.products_col.find_one({
                 "is_active": True,
                 "name": {"$regex": f"^{re.escape(name[:30])}.*", "$options": "i"}
-            })
+            }, _PRODUCT_PROJECTION)
             if product:
                 return self.format_product(product)
 
             # Try with cleaned keywords
-            keywords = re.findall(r'\b\w+\b', name_clean)
-            keywords = [k for k in keywords if len(k) > 1]
+            keywords = [k for k in _tokenize(name_clean) if len(k) > 1]
 
             if keywords:
                 # Build regex pattern that matches all keywords in any order
@@ -373,7 +538,7 @@ class ProductHandler(BaseHandler):
                 product = self.products_col.find_one({
                     "is_active": True,
                     "$and": patterns
-                })
+                }, _PRODUCT_PROJECTION)
                 if product:
                     return self.format_product(product)
 
@@ -381,7 +546,7 @@ class ProductHandler(BaseHandler):
                 product = self.products_col.find_one({
                     "is_active": True,
                     "$or": patterns
-                })
+                }, _PRODUCT_PROJECTION)
                 if product:
                     return self.format_product(product)
 
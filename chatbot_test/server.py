@@ -4,13 +4,13 @@ Features: Rate limiting, Admin endpoints, Session persistence
 Run this to start the chatbot web service
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from functools import wraps
 import os
 import atexit
 
-from chatbot import OVNStoreChatbot
+from chatbot import get_bot
 from core.security import security_middleware, sanitize_input, check_rate_limit
 from core.error_messages import get_friendly_error, build_error_response
 from core.persistence import get_session_store, get_analytics_store
@@ -18,8 +18,8 @@ from core.persistence import get_session_store, get_analytics_store
 app = Flask(__name__, static_folder='static')
 CORS(app)  # Enable CORS for frontend access
 
-# Initialize single chatbot instance (handles sessions internally)
-chatbot = OVNStoreChatbot()
+# Shared chatbot instance (handles sessions internally)
+chatbot = get_bot()
 
 # Admin authentication (simple token-based for demo)
 ADMIN_TOKEN = os.getenv('CHATBOT_ADMIN_TOKEN', 'admin-secret-token')
@@ -54,36 +54,68 @@ def chat():
         # Rate limit check
         allowed, wait_seconds = check_rate_limit(session_id)
         if not allowed:
-            return jsonify(build_error_response(
-                'rate_limited',
-                include_quick_replies=False
-            )), 429
+            return _error_response('rate_limited', 429, include_quick_replies=False)
 
         # Sanitize input
         user_message = sanitize_input(user_message)
 
         if not user_message:
-            return jsonify(build_error_response('empty_message')), 400
+            return _error_response('empty_message', 400)
 
         # Get response from chatbot
         result = chatbot.chat(user_message, session_id)
 
         # Save session to MongoDB after each message
-        try:
-            chatbot.session_manager.save_session(session_id)
-        except Exception as e:
-            print(f"Warning: Could not save session: {e}")
+        _save_session(session_id)
 
+        return jsonify(_chat_payload(result, session_id))
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
         return jsonify({
-            'success': True,
-            'response': result.get('response', result.get('message', '')),
-            'products': result.get('products', []),
-            'categories': result.get('categories', []),
-            'quick_replies': result.get('quick_replies', []),
-            'intent': result.get('intent', 'general'),
-            'metadata': result.get('metadata', {}),
-            'session_id': session_id
-        })
+            'success': False,
+            'error': get_friendly_error('server_error'),
+            'error_detail': str(e) if app.debug else None
+        }), 500
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Like /api/chat, but AI-generated replies are streamed back as plain
+    text while they are generated. Every other reply (products, flows,
+    errors) is returned as the same JSON as /api/chat.
+    """
+    try:
+        data = request.json
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', 'default')
+
+        # Rate limit check
+        allowed, wait_seconds = check_rate_limit(session_id)
+        if not allowed:
+            return _error_response('rate_limited', 429, include_quick_replies=False)
+
+        # Sanitize input
+        user_message = sanitize_input(user_message)
+
+        if not user_message:
+            return _error_response('empty_message', 400)
+
+        result = chatbot.chat(user_message, session_id, stream=True)
+
+        pieces = result.get('stream')
+        if pieces is None:
+            _save_session(session_id)
+            return jsonify(_chat_payload(result, session_id))
+
+        def generate():
+            yield from pieces
+            # History is complete once the last piece is sent
+            _save_session(session_id)
+
+        return Response(stream_with_context(generate()), mimetype='text/plain; charset=utf-8')
 
     except Exception as e:
         import traceback
@@ -95,6 +127,34 @@ def chat():
         }), 500
 
 
+def _save_session(session_id: str):
+    """Save session to MongoDB, logging (not raising) failures"""
+    try:
+        chatbot.session_manager.save_session(session_id)
+    except Exception as e:
+        print(f"Warning: Could not save session: {e}")
+
+
+def _error_response(error_type: str, status: int, **kwargs) -> Response:
+    """Error reply, serialized once by build_error_response"""
+    body = build_error_response(error_type, serialize=True, **kwargs)
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _chat_payload(result: dict, session_id: str) -> dict:
+    """JSON body for a chat reply"""
+    return {
+        'success': True,
+        'response': result.get('response', result.get('message', '')),
+        'products': result.get('products', []),
+        'categories': result.get('categories', []),
+        'quick_replies': result.get('quick_replies', []),
+        'intent': result.get('intent', 'general'),
+        'metadata': result.get('metadata', {}),
+        'session_id': session_id
+    }
+
+
 @app.route('/api/clear', methods=['POST'])
 def clear_session():
     """Clear session and conversation history"""